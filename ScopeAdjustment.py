@@ -1,75 +1,132 @@
+import time
+START_TIME = time.perf_counter()  # before the imports, so --measure-startup includes them
+
+import argparse
+import queue
+import sys
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk
-import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
+from history_store import HistoryWorker, statistics_record
+import instrumentation
+
+# PIL, NumPy and the modules built on them are imported where they are first
+# used, since importing them takes longer than building the whole window.
+# Once the window is up they are imported on a background thread (see
+# preload_modules) so the first upload or calculation does not wait for them.
+PRELOAD_MODULES = ('PIL.ImageTk', 'target_image', 'shot_detection', 'adjustment_core', 'group_stats')
+
+# Rows fetched per history page; more are fetched as the table is scrolled
+HISTORY_PAGE_SIZE = 100
+
+# Seconds from launch until the window is drawn that --measure-startup allows
+STARTUP_TARGET = 0.5
+
 
 class ScopeAdjustmentApp:
     def __init__(self, master):
         self.master = master
         self.master.title("Scope Adjustment Calculator")
         self.image_path = None
-        self.image = None
-        self.shot_coordinates = []
-        self.target_center = None  # Store custom target center coordinates
+        self.image = None  # preview shown on the canvas
+        self.mapper = None  # maps between original-image pixels and the canvas
+        self.shot_coordinates = []  # in original-image pixels
+        self.target_center = None  # Store custom target center coordinates (original-image pixels)
+        
+        # Canvas item IDs, kept so marks can be moved or deleted without a full redraw
+        self.image_item = None
+        self.shot_items = []  # parallel to shot_coordinates
+        self.center_item = None
+        
+        # Undo/redo stacks of marking actions (see apply_action)
+        self.undo_stack = []
+        self.redo_stack = []
         self.marking_mode = tk.StringVar(value="shots")  # Track current marking mode
         self.target_width = tk.StringVar()
         self.target_height = tk.StringVar()
         self.target_distance = tk.StringVar()
         self.adjustment_type = tk.StringVar(value="MOA")
+        self.center_method = tk.StringVar(value="mean")  # how the group center is estimated
+        self.reject_fliers = tk.BooleanVar(value=False)
         
         # Bullet variables
         self.bullet_manufacturer = tk.StringVar()
         self.bullet_model = tk.StringVar()
         self.bullet_weight = tk.StringVar()
+        
+        # Load ballistics, used when ballistic correction is on
+        self.ballistic_mode = tk.BooleanVar(value=False)
+        self.muzzle_velocity = tk.StringVar()
+        self.ballistic_coef = tk.StringVar()
+        self.drag_function = tk.StringVar(value="G1")
+        self.sight_height = tk.StringVar(value="1.5")
+        self.zero_range = tk.StringVar()
+        self.crosswind = tk.StringVar(value="0")
+        
+        # History filters and the keyset position of the last loaded row
+        self.history_date_from = tk.StringVar()
+        self.history_date_to = tk.StringVar()
+        self.history_distance = tk.StringVar()
+        self.history_bullet = tk.StringVar()
+        self.history_user = tk.StringVar()
+        self.history_query = {}  # filters applied to the loaded rows
+        self.history_after = None
+        self.history_more = False
+        self.history_loading = False  # a page request is in flight
+        self.history_generation = 0  # bumped on reload so stale pages are dropped
 
         # Create data directory if it doesn't exist
         self.data_dir = os.path.join(os.path.expanduser("~"), "scope_adjustment_data")
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
+        self.thumbnails = None  # ThumbnailCache, created on the first upload
             
         self.setup_database()
         self.current_user = None
+        self.history_tree = None  # built when the History tab is first shown
+        self.performance_tree = None  # built when the Performance tab is first shown
         self.create_notebook()
+        self.master.after_idle(self.preload_modules)
         
     def setup_database(self):
-        """Initialize SQLite database for storing calibration history and user profiles"""
-
-        # Store database in user's home directory
-        db_path = os.path.join(self.data_dir, 'scope_adjustments.db')
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
-        
-        # Create tables
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                username TEXT UNIQUE,
-                created_date TIMESTAMP
-            )
-        ''')
-        
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS calibration_history (
-                id INTEGER PRIMARY KEY,
-                user_id INTEGER,
-                date TIMESTAMP,
-                target_distance FLOAT,
-                horizontal_adjustment FLOAT,
-                vertical_adjustment FLOAT,
-                adjustment_type TEXT,
-                bullet_manufacturer TEXT,
-                bullet_model TEXT,
-                bullet_weight INTEGER,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        self.conn.commit()
+        """Open the database storing calibration history and user profiles, migrating it if needed"""
+
+        # Store database in user's home directory. All queries run on the worker's
+        # thread; their results are handed back to Tk by poll_database
+        self.db = HistoryWorker(os.path.join(self.data_dir, 'scope_adjustments.db'))
+        self.db_polling = False
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def db_request(self, method, *args, callback=None, **kwargs):
+        """Run a HistoryStore method in the background; callback gets its result on the Tk thread"""
+
+        self.db.submit(method, *args, callback=callback, errback=self.show_database_error, **kwargs)
+        if not self.db_polling:
+            self.db_polling = True
+            self.master.after(20, self.poll_database)
+
+    def poll_database(self):
+        """Deliver finished database results, polling again while any are outstanding"""
+
+        if self.db.dispatch():
+            self.master.after(20, self.poll_database)
+        else:
+            self.db_polling = False
+
+    def show_database_error(self, error):
+        messagebox.showerror("Database Error", str(error))
+
+    def on_close(self):
+        """Let queued database writes finish, then close the window"""
+
+        self.db.close()
+        self.master.destroy()
 
     def create_notebook(self):
-        """Create the notebook to hold the main and history tabs"""
+        """Create the notebook to hold the main, history and performance tabs"""
         
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.master)
@@ -83,9 +140,32 @@ class ScopeAdjustmentApp:
         self.history_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.history_frame, text='History')
         
-        # Create the widgets in each tab
+        # Performance tab
+        self.performance_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.performance_frame, text='Performance')
+        
+        # Only the main tab is built now; the others on first selection
         self.create_main_widgets()
-        self.create_history_widgets()
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+
+    def on_tab_changed(self, event):
+        """Build the History and Performance tabs the first time they are shown"""
+
+        selected = self.notebook.nametowidget(self.notebook.select())
+        if selected is self.history_frame and self.history_tree is None:
+            self.create_history_widgets()
+        elif selected is self.performance_frame:
+            if self.performance_tree is None:
+                self.create_performance_widgets()
+            self.load_performance()
+
+    def preload_modules(self):
+        """Import the modules left out of startup on a background thread"""
+
+        def load():
+            for name in PRELOAD_MODULES:
+                __import__(name)
+        threading.Thread(target=load, name='preload', daemon=True).start()
     
     def create_image_frame(self, parent_frame):
         """Create the frame that will hold the target image and canvas"""
@@ -147,6 +227,22 @@ class ScopeAdjustmentApp:
                        value="center",
                        command=self.update_center_display).pack(side=tk.LEFT, padx=5)
         
+        # Add group center estimation selection
+        center_method_frame = ttk.Frame(measurement_frame)
+        center_method_frame.pack(pady=5)
+        ttk.Label(center_method_frame, text="Group Center:").pack(side=tk.LEFT, padx=5)
+        for text, value in (("Mean", "mean"), ("Median", "median"), ("Trimmed Mean", "trimmed")):
+            ttk.Radiobutton(center_method_frame,
+                           text=text,
+                           variable=self.center_method,
+                           value=value).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(center_method_frame,
+                        text="Reject Fliers",
+                        variable=self.reject_fliers).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(center_method_frame,
+                        text="Ballistic Correction",
+                        variable=self.ballistic_mode).pack(side=tk.LEFT, padx=5)
+        
         # Create a frame for the action buttons
         button_frame = ttk.Frame(measurement_frame)
         button_frame.pack(pady=5)
@@ -162,6 +258,11 @@ class ScopeAdjustmentApp:
                                           command=self.start_marking_shots)
         self.mark_shots_button.pack(side=tk.LEFT, padx=5)
         
+        self.detect_shots_button = ttk.Button(button_frame,
+                                            text="Detect Shots",
+                                            command=self.auto_detect_shots)
+        self.detect_shots_button.pack(side=tk.LEFT, padx=5)
+        
         self.clear_button = ttk.Button(button_frame,
                                      text="Clear All",
                                      command=self.clear_all)
@@ -171,20 +272,28 @@ class ScopeAdjustmentApp:
                                          text="Calculate Adjustment",
                                          command=self.calculate_adjustment)
         self.calculate_button.pack(side=tk.LEFT, padx=5)
+        
+        # Undo/redo for marking
+        history_button_frame = ttk.Frame(measurement_frame)
+        history_button_frame.pack(pady=5)
+        
+        self.undo_button = ttk.Button(history_button_frame, text="Undo", command=self.undo)
+        self.undo_button.pack(side=tk.LEFT, padx=5)
+        
+        self.redo_button = ttk.Button(history_button_frame, text="Redo", command=self.redo)
+        self.redo_button.pack(side=tk.LEFT, padx=5)
+        
+        self.master.bind("<Control-z>", lambda event: self.marking_shortcut(self.undo))
+        self.master.bind("<Control-y>", lambda event: self.marking_shortcut(self.redo))
 
     def update_center_display(self):
         """Update the display to show or hide the center point based on mode"""
 
         if self.image:
-            self.redraw_canvas()
             if self.marking_mode.get() == "default":
-                center_x, center_y = 250, 250
-                self.canvas.create_oval(center_x-5, center_y-5, center_x+5, center_y+5, 
-                                     fill="blue", tags="center")
-                self.target_center = (center_x, center_y)
-            elif self.target_center:
-                x, y = self.target_center
-                self.canvas.create_oval(x-5, y-5, x+5, y+5, fill="blue", tags="center")
+                self.set_center(self.mapper.center())
+            else:
+                self.set_center(self.target_center)
 
     def start_marking_center(self):
         """Enable center marking mode"""
@@ -200,22 +309,17 @@ class ScopeAdjustmentApp:
     def mark_center(self, event):
         """Handle marking the center point"""
 
-        self.target_center = (event.x, event.y)
-        self.redraw_canvas()
-        self.canvas.create_oval(event.x-5, event.y-5, event.x+5, event.y+5, 
-                              fill="blue", tags="center")
+        self.do_action(("center", self.target_center, self.mapper.to_original(event.x, event.y)))
         self.canvas.unbind("<Button-1>")
         messagebox.showinfo("Center Marked", "Target center has been marked")
 
     def clear_all(self):
         """Clear all markings from the canvas"""
 
-        self.shot_coordinates = []
-        self.target_center = None
-        if self.marking_mode.get() == "default":
-            self.target_center = (250, 250)
-        self.redraw_canvas()
-        self.update_center_display()
+        if not self.image:
+            return
+        center = self.mapper.center() if self.marking_mode.get() == "default" else None
+        self.do_action(("state", (list(self.shot_coordinates), self.target_center), ([], center)))
 
     def create_main_widgets(self):
         """Create all widgets """
@@ -249,37 +353,158 @@ class ScopeAdjustmentApp:
         ballistics_frame = ttk.LabelFrame(bullet_information_tab, text="Bullet Information")
         ballistics_frame.pack(padx=5, pady=5, fill="x")
         
-        ttk.Label(ballistics_frame, text="Bullet Manufacturer:").pack()
-        ttk.Entry(ballistics_frame, textvariable=self.bullet_manufacturer).pack()
+        for text, variable in (("Bullet Manufacturer:", self.bullet_manufacturer),
+                               ("Bullet Model:", self.bullet_model),
+                               ("Bullet Grain:", self.bullet_weight)):
+            ttk.Label(ballistics_frame, text=text).pack()
+            entry = ttk.Entry(ballistics_frame, textvariable=variable)
+            entry.pack()
+            # Fill in the velocity and BC last used with this bullet
+            entry.bind('<FocusOut>', lambda event: self.lookup_bullet_profile(quiet=True))
+        
+        # Load ballistics frame, for the trajectory solver
+        load_frame = ttk.LabelFrame(bullet_information_tab, text="Ballistic Correction")
+        load_frame.pack(padx=5, pady=5, fill="x")
+        
+        ttk.Label(load_frame, text="Muzzle Velocity (fps):").pack()
+        ttk.Entry(load_frame, textvariable=self.muzzle_velocity).pack()
         
-        ttk.Label(ballistics_frame, text="Bullet Model:").pack()
-        ttk.Entry(ballistics_frame, textvariable=self.bullet_model).pack()
+        ttk.Label(load_frame, text="Ballistic Coefficient:").pack()
+        ttk.Entry(load_frame, textvariable=self.ballistic_coef).pack()
         
-        ttk.Label(ballistics_frame, text="Bullet Grain:").pack()
-        ttk.Entry(ballistics_frame, textvariable=self.bullet_weight).pack()
+        ttk.Label(load_frame, text="Drag Model:").pack()
+        # The drag tables need NumPy, so the choices are only listed when the box is opened
+        drag_box = ttk.Combobox(load_frame, textvariable=self.drag_function, values=(self.drag_function.get(),),
+                                state='readonly')
+        drag_box.configure(postcommand=lambda: drag_box.configure(values=self.drag_model_names()))
+        drag_box.pack()
+        
+        ttk.Label(load_frame, text="Sight Height (inches):").pack()
+        ttk.Entry(load_frame, textvariable=self.sight_height).pack()
+        
+        ttk.Label(load_frame, text="Zero Range (yards, blank for target distance):").pack()
+        ttk.Entry(load_frame, textvariable=self.zero_range).pack()
+        
+        ttk.Label(load_frame, text="Crosswind While Shooting (mph, + from left):").pack()
+        ttk.Entry(load_frame, textvariable=self.crosswind).pack()
+        
+        ttk.Button(load_frame, text="Look Up Saved Load", command=self.lookup_bullet_profile).pack(pady=5)
         
         # Rest of the widgets...
         self.create_image_frame(target_tab)
         self.create_control_buttons(target_tab)
 
+    @instrumentation.timed("ui.redraw_canvas")
     def redraw_canvas(self):
-        """Redraw the canvas with the current image and all markings"""
+        """Rebuild the canvas with the current image and all markings (only needed for a new image)"""
 
         self.canvas.delete("all")
+        self.image_item = None
+        self.shot_items = []
+        self.center_item = None
         if self.image:
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
-            for x, y in self.shot_coordinates:
-                self.canvas.create_oval(x-5, y-5, x+5, y+5, fill="red")
+            self.image_item = self.canvas.create_image(*self.mapper.offset, anchor=tk.NW, image=self.photo)
+            self.shot_items = [self.create_shot_item(shot) for shot in self.shot_coordinates]
+            self.set_center(self.target_center)
+
+    def create_shot_item(self, shot):
+        """Draw one shot (original-image pixels) and return its canvas item ID"""
+
+        x, y = self.mapper.to_display(*shot)
+        return self.canvas.create_oval(x-5, y-5, x+5, y+5, fill="red", tags="shot")
+
+    def insert_shot(self, index, shot):
+        """Add a shot at index in shot_coordinates and on the canvas"""
+
+        self.shot_coordinates.insert(index, shot)
+        self.shot_items.insert(index, self.create_shot_item(shot))
+
+    def delete_shot(self, index):
+        """Remove the shot at index from shot_coordinates and the canvas"""
+
+        del self.shot_coordinates[index]
+        self.canvas.delete(self.shot_items.pop(index))
+
+    def set_shots(self, shots):
+        """Replace every shot, touching only the shot items on the canvas"""
+
+        self.canvas.delete("shot")
+        self.shot_coordinates = list(shots)
+        self.shot_items = [self.create_shot_item(shot) for shot in self.shot_coordinates]
+
+    def set_center(self, center):
+        """Set the target center, moving its existing canvas item rather than redrawing"""
+
+        self.target_center = center
+        if center is None:
+            if self.center_item is not None:
+                self.canvas.delete(self.center_item)
+                self.center_item = None
+            return
+        
+        x, y = self.mapper.to_display(*center)
+        if self.center_item is None:
+            self.center_item = self.canvas.create_oval(x-5, y-5, x+5, y+5, fill="blue", tags="center")
+        else:
+            self.canvas.coords(self.center_item, x-5, y-5, x+5, y+5)
+            self.canvas.tag_raise(self.center_item)
+
+    def apply_action(self, action, undo=False):
+        """Apply a marking action, or reverse it when undo is set"""
+
+        # Actions are ("add", index, shot), ("remove", index, shot),
+        # ("center", old center, new center) and
+        # ("state", (old shots, old center), (new shots, new center))
+        kind = action[0]
+        if kind in ("add", "remove"):
+            _, index, shot = action
+            if (kind == "add") != undo:
+                self.insert_shot(index, shot)
+            else:
+                self.delete_shot(index)
+        elif kind == "center":
+            self.set_center(action[1] if undo else action[2])
+        else:  # state
+            shots, center = action[1] if undo else action[2]
+            self.set_shots(shots)
+            self.set_center(center)
+
+    def do_action(self, action):
+        """Apply a new marking action and make it undoable"""
+
+        self.apply_action(action)
+        self.undo_stack.append(action)
+        self.redo_stack.clear()
+
+    def marking_shortcut(self, command):
+        """Run undo/redo from the keyboard, unless the keys are meant for a text field"""
+
+        if isinstance(self.master.focus_get(), (tk.Entry, ttk.Entry)):
+            return
+        command()
+
+    def undo(self):
+        """Undo the last marking action"""
+
+        if self.undo_stack:
+            action = self.undo_stack.pop()
+            self.apply_action(action, undo=True)
+            self.redo_stack.append(action)
+
+    def redo(self):
+        """Redo the last undone marking action"""
+
+        if self.redo_stack:
+            action = self.redo_stack.pop()
+            self.apply_action(action)
+            self.undo_stack.append(action)
     
     def clear_shots(self):
         """Clear all marked shots from the canvas and reset shot coordinates"""
 
         if self.image:
-            # Redraw the image
-            self.canvas.delete("all")
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
-            # Clear the shot coordinates
-            self.shot_coordinates = []
+            self.do_action(("state", (list(self.shot_coordinates), self.target_center),
+                            ([], self.target_center)))
             messagebox.showinfo("Clear Shots", "All shots have been cleared")
         else:
             messagebox.showinfo("Clear Shots", "No image loaded")
@@ -297,55 +522,235 @@ class ScopeAdjustmentApp:
         # Add clear history button
         ttk.Button(control_frame, text="Clear History", command=self.clear_history).pack(side=tk.LEFT, padx=5)
         
-        # Create Treeview for history
-        columns = ('Date', 'Distance', 'Horizontal', 'Vertical', 'Type', 'Bullet Manufacturer', 'Bullet Model', 'Bullet Grain')
-        self.history_tree = ttk.Treeview(self.history_frame, columns=columns, show='headings')
+        # Create frame for history filters
+        filter_frame = ttk.Frame(self.history_frame)
+        filter_frame.pack(fill='x', padx=5, pady=5)
+        for text, variable, width in (("From (YYYY-MM-DD):", self.history_date_from, 12),
+                                      ("To:", self.history_date_to, 12),
+                                      ("Distance (yards):", self.history_distance, 6),
+                                      ("Bullet:", self.history_bullet, 15),
+                                      ("User ID:", self.history_user, 5)):
+            ttk.Label(filter_frame, text=text).pack(side=tk.LEFT, padx=2)
+            entry = ttk.Entry(filter_frame, textvariable=variable, width=width)
+            entry.pack(side=tk.LEFT, padx=2)
+            entry.bind('<Return>', lambda event: self.load_history())
+        ttk.Button(filter_frame, text="Filter", command=self.load_history).pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Reset", command=self.reset_history_filters).pack(side=tk.LEFT, padx=5)
+        
+        # Create Treeview for history, with a scrollbar that fetches more rows near the bottom
+        tree_frame = ttk.Frame(self.history_frame)
+        tree_frame.pack(padx=5, pady=5, fill='both', expand=True)
+        columns = ('Date', 'Distance', 'Horizontal', 'Vertical', 'Type', 'Bullet Manufacturer', 'Bullet Model', 'Bullet Grain',
+                   'Shots', 'Extreme Spread', 'CEP')
+        self.history_tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
+        self.history_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.history_tree.yview)
+        self.history_tree.configure(yscrollcommand=self.on_history_scroll)
         
         # Set column headings
         for col in columns:
             self.history_tree.heading(col, text=col)
             self.history_tree.column(col, width=100)
         
-        self.history_tree.pack(padx=5, pady=5, fill='both', expand=True)
+        self.history_scrollbar.pack(side=tk.RIGHT, fill='y')
+        self.history_tree.pack(side=tk.LEFT, fill='both', expand=True)
+        
+        self.load_history()
+
+    def create_performance_widgets(self):
+        """Create the widgets for the performance tab"""
+
+        control_frame = ttk.Frame(self.performance_frame)
+        control_frame.pack(fill='x', padx=5, pady=5)
+        
+        # Recording is off unless turned on here or with SCOPE_ADJUSTMENT_PROFILE
+        self.profiling = tk.BooleanVar(value=instrumentation.enabled)
+        ttk.Checkbutton(control_frame, text="Record Timings", variable=self.profiling,
+                        command=lambda: instrumentation.enable(self.profiling.get())).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Refresh", command=self.load_performance).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Reset", command=self.reset_performance).pack(side=tk.LEFT, padx=5)
+        ttk.Button(control_frame, text="Save JSON", command=self.save_performance).pack(side=tk.LEFT, padx=5)
+        
+        columns = ('Name', 'Calls', 'Total (ms)', 'Mean (ms)', 'Max (ms)')
+        self.performance_tree = ttk.Treeview(self.performance_frame, columns=columns, show='headings')
+        for col in columns:
+            self.performance_tree.heading(col, text=col)
+            self.performance_tree.column(col, width=220 if col == 'Name' else 100)
+        self.performance_tree.pack(padx=5, pady=5, fill='both', expand=True)
+
+    def load_performance(self):
+        """Show the timers and counters recorded so far"""
+
+        self.performance_tree.delete(*self.performance_tree.get_children())
+        snapshot = instrumentation.snapshot()
+        for name, timer in snapshot['timers'].items():
+            self.performance_tree.insert('', 'end', values=(name, timer['calls'], f"{timer['total_ms']:.1f}",
+                                                            f"{timer['mean_ms']:.2f}", f"{timer['max_ms']:.2f}"))
+        for name, total in snapshot['counters'].items():
+            self.performance_tree.insert('', 'end', values=(name, total, "", "", ""))
+
+    def reset_performance(self):
+        """Forget the recorded timings"""
+
+        instrumentation.reset()
+        self.load_performance()
+
+    def save_performance(self):
+        """Write the recorded timings to a JSON file"""
+
+        path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if path:
+            try:
+                instrumentation.dump(path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not save {path}: {e}")
+
+    def on_history_scroll(self, first, last):
+        """Update the scrollbar and fetch the next page once the end of the loaded rows comes into view"""
+
+        self.history_scrollbar.set(first, last)
+        if self.history_more and not self.history_loading and float(last) > 0.9:
+            self.load_history_page()
+
+    def reset_history_filters(self):
+        """Clear the history filters and reload"""
+
+        for variable in (self.history_date_from, self.history_date_to, self.history_distance,
+                         self.history_bullet, self.history_user):
+            variable.set("")
+        self.load_history()
+
+    def history_filters(self):
+        """The history filters as HistoryStore.page arguments; raises ValueError for invalid entries"""
+
+        filters = {}
+        if self.history_date_from.get().strip():
+            filters['date_from'] = datetime.strptime(self.history_date_from.get().strip(), '%Y-%m-%d').timestamp()
+        if self.history_date_to.get().strip():
+            # Inclusive of the whole "to" day
+            date_to = datetime.strptime(self.history_date_to.get().strip(), '%Y-%m-%d') + timedelta(days=1)
+            filters['date_to'] = date_to.timestamp()
+        if self.history_distance.get().strip():
+            filters['distance'] = float(self.history_distance.get())
+        if self.history_bullet.get().strip():
+            filters['bullet'] = self.history_bullet.get().strip()
+        if self.history_user.get().strip():
+            filters['user_id'] = int(self.history_user.get())
+        return filters
 
     def clear_history(self):
         """Clear all history from the database"""
 
         if messagebox.askyesno("Clear History", "Are you sure you want to clear all history? This cannot be undone."):
-            self.cursor.execute('DELETE FROM calibration_history')
-            self.conn.commit()
-            self.load_history()
-            messagebox.showinfo("Clear History", "History has been cleared")
+            def cleared(_):
+                self.load_history()
+                messagebox.showinfo("Clear History", "History has been cleared")
+            self.db_request('clear', callback=cleared)
 
-    def __del__(self):
-        """Ensure database connection is closed when the app is closed"""
+    def drag_model_names(self):
+        """The registered drag models, for the drag model box"""
+
+        from drag_models import drag_models
+        return drag_models()
 
-        if hasattr(self, 'conn'):
-            self.conn.close()
-    
     def upload_image(self):
         """Handles the image uploading to the app"""
 
         self.image_path = filedialog.askopenfilename()
         if self.image_path:
-            self.image = Image.open(self.image_path)
-            self.image = self.image.resize((500, 500))
-            self.photo = ImageTk.PhotoImage(self.image)
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+            from PIL import ImageTk
+            from target_image import CoordinateMapper, ThumbnailCache
+            if self.thumbnails is None:
+                self.thumbnails = ThumbnailCache(os.path.join(self.data_dir, 'thumbnails'))
+            # Only a fast, cached preview is decoded; marks are kept in original-image pixels
+            with instrumentation.timer("ui.load_preview"):
+                self.image, original_size = self.thumbnails.load(self.image_path, (500, 500))
+            self.mapper = CoordinateMapper(original_size, (500, 500))
+            with instrumentation.timer("ui.photo_image"):
+                self.photo = ImageTk.PhotoImage(self.image)
+            self.shot_coordinates = []
+            self.target_center = None
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.redraw_canvas()
+            self.update_center_display()
     
     def start_marking_shots(self):
         """This functions binds the left mouce click to the mark_shot function defined below"""
 
         self.canvas.bind("<Button-1>", self.mark_shot)
+        self.canvas.bind("<Button-3>", self.remove_shot)
         messagebox.showinfo("Mark Shots", "Click on the image to mark each shot. Press 'Calculate Adjustment' when done.")
     
     def mark_shot(self, event):
         """This function will keep track of all the coordinates that a user marks"""
 
-        x, y = event.x, event.y
-        self.shot_coordinates.append((x, y))
-        self.canvas.create_oval(x-5, y-5, x+5, y+5, fill="red")
+        shot = self.mapper.to_original(event.x, event.y)
+        self.do_action(("add", len(self.shot_coordinates), shot))
+
+    def remove_shot(self, event):
+        """Remove the marked shot closest to a right-click, if one is within 10 pixels"""
+
+        if not self.shot_coordinates:
+            return
+        shots = [self.mapper.to_display(*shot) for shot in self.shot_coordinates]
+        distances = [(x - event.x) ** 2 + (y - event.y) ** 2 for x, y in shots]
+        nearest = distances.index(min(distances))
+        if distances[nearest] <= 10 ** 2:
+            self.do_action(("remove", nearest, self.shot_coordinates[nearest]))
+
+    def auto_detect_shots(self):
+        """Find the bullet holes in the full-resolution image on a background thread"""
+
+        if not self.image:
+            messagebox.showerror("Error", "Please upload an image first")
+            return
+
+        image_path = self.image_path
+        results = queue.Queue()
+
+        def detect():
+            from PIL import Image
+            from shot_detection import detect_shots
+            try:
+                # Detection needs the full-resolution image, which the preview never decodes
+                with Image.open(image_path) as original_image:
+                    results.put((detect_shots(original_image), None))
+            except Exception as e:
+                results.put((None, e))
+
+        # Detection takes over a second on a large scan, so the Tk thread only polls for it
+        self.detect_shots_button.state(['disabled'])
+        self.master.config(cursor='watch')
+        threading.Thread(target=detect, name='detect-shots', daemon=True).start()
+        self.master.after(50, self.finish_detecting_shots, image_path, results)
+
+    def finish_detecting_shots(self, image_path, results):
+        """Mark the detected holes as shots once the detection thread is done"""
+
+        try:
+            holes, error = results.get_nowait()
+        except queue.Empty:
+            self.master.after(50, self.finish_detecting_shots, image_path, results)
+            return
+
+        self.detect_shots_button.state(['!disabled'])
+        self.master.config(cursor='')
+        if error is not None:
+            messagebox.showerror("Error", f"Could not detect shots: {error}")
+            return
+        if image_path != self.image_path:
+            return  # another image was uploaded while detecting
+
+        self.do_action(("state", (list(self.shot_coordinates), self.target_center),
+                        (list(holes), self.target_center)))
 
+        self.canvas.bind("<Button-1>", self.mark_shot)
+        self.canvas.bind("<Button-3>", self.remove_shot)
+        messagebox.showinfo("Detect Shots",
+                            f"Found {len(holes)} shots. Left-click to add a missed shot, "
+                            "right-click to remove a wrong one.")
+
+    @instrumentation.timed("ui.calculate_adjustment")
     def calculate_adjustment(self):
         """The math for figuring out the adjustments needed to sight in the rifle"""
 
@@ -363,82 +768,193 @@ class ScopeAdjustmentApp:
         
         # Get center coordinates based on mode
         if self.marking_mode.get() == "default":
-            center_x, center_y = 250, 250
+            center = None  # image center
         else:
             if not self.target_center:
                 messagebox.showerror("Error", "Please mark the target center first")
                 return
-            center_x, center_y = self.target_center
-        
-        # Calculate average position of shots
-        avg_x = sum(x for x, _ in self.shot_coordinates) / len(self.shot_coordinates)
-        avg_y = sum(y for _, y in self.shot_coordinates) / len(self.shot_coordinates)
+            center = self.target_center
+        
+        ballistic = self.ballistic_mode.get()
+        if ballistic:
+            try:
+                velocity = float(self.muzzle_velocity.get())
+                ballistic_coef = float(self.ballistic_coef.get())
+                sight_height = float(self.sight_height.get())
+                zero_range = float(self.zero_range.get()) if self.zero_range.get().strip() else None
+                crosswind = float(self.crosswind.get() or 0)
+            except ValueError:
+                messagebox.showerror("Error", "Please enter valid numeric values for the ballistic correction "
+                                              "on the Bullet Information tab")
+                return
         
-        # Calculate difference from center in inches
-        diff_x = center_x - avg_x
-        diff_y = center_y - avg_y
+        from adjustment_core import calculate_adjustment, calculate_ballistic_adjustment
+        from group_stats import group_statistics
         
-        adjustment_x = (diff_x / 500) * target_width
-        adjustment_y = (-diff_y / 500) * target_height
+        try:
+            if ballistic:
+                result = calculate_ballistic_adjustment(self.shot_coordinates, center, target_width, target_height,
+                                                        target_distance, velocity, ballistic_coef,
+                                                        self.adjustment_type.get(), self.mapper.original_size,
+                                                        self.center_method.get(), self.reject_fliers.get(),
+                                                        zero_range, sight_height, self.drag_function.get(), crosswind)
+            else:
+                result = calculate_adjustment(self.shot_coordinates, center, target_width, target_height,
+                                              target_distance, self.adjustment_type.get(),
+                                              self.mapper.original_size, self.center_method.get(),
+                                              self.reject_fliers.get())
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        adjustment_x_angular = result['horizontal']
+        adjustment_y_angular = result['vertical']
+        unit = result['unit']
         
-        # Convert to MOA or MIL based on selection
-        if self.adjustment_type.get() == "MOA":
-            adjustment_x_angular = (adjustment_x / (target_distance / 100)) / 1.047
-            adjustment_y_angular = (adjustment_y / (target_distance / 100)) / 1.047
-            unit = "MOA"
-        else:
-            adjustment_x_angular = (adjustment_x / (target_distance / 100)) / 3.6
-            adjustment_y_angular = (adjustment_y / (target_distance / 100)) / 3.6
-            unit = "MIL"
+        # Group size in inches
+        image_width, image_height = self.mapper.original_size
+        stats = group_statistics(self.shot_coordinates, (target_width / image_width, target_height / image_height),
+                                 self.center_method.get(), self.reject_fliers.get())
         
         # Save to history
         self.save_calibration(target_distance, adjustment_x_angular, adjustment_y_angular, unit,
                             self.bullet_manufacturer.get(), self.bullet_model.get(), 
-                            int(self.bullet_weight.get()) if self.bullet_weight.get() else 0)
+                            int(self.bullet_weight.get()) if self.bullet_weight.get() else 0,
+                            stats)
+        
+        # Remember the load for this bullet
+        if ballistic and (self.bullet_manufacturer.get().strip() or self.bullet_model.get().strip()):
+            self.db_request('save_bullet_profile', self.bullet_manufacturer.get(), self.bullet_model.get(),
+                            int(self.bullet_weight.get()) if self.bullet_weight.get() else 0,
+                            velocity, ballistic_coef, self.drag_function.get())
         
         # Show results
+        fliers = f" ({len(stats['rejected'])} fliers rejected)" if stats['rejected'] else ""
+        ballistics = ""
+        if ballistic:
+            ballistics = (f"Point of impact for a {zero_range or target_distance:g} yard zero: "
+                          f"{result['poi_inches']:+.2f} in\n"
+                          f"Wind drift removed: {result['drift_inches']:+.2f} in\n")
         messagebox.showinfo("Adjustment Needed", 
                           f"Horizontal: {adjustment_x_angular:.2f} {unit}\n"
                           f"Vertical: {adjustment_y_angular:.2f} {unit}\n"
-                          f"At {target_distance} yards")
+                          f"At {target_distance} yards\n"
+                          f"{ballistics}\n"
+                          f"Group of {stats['count']} shots{fliers}\n"
+                          f"Extreme spread: {stats['extreme_spread']:.2f} in\n"
+                          f"Mean radius: {stats['mean_radius']:.2f} in\n"
+                          f"CEP (R50): {stats['cep']:.2f} in")
+
+    def lookup_bullet_profile(self, quiet=False):
+        """Fill in the velocity, BC and drag model saved for the entered bullet"""
 
-    def save_calibration(self, distance, horizontal, vertical, adjustment_type, bullet_manufacturer, bullet_model, bullet_weight):
-        """Save calibration data to database"""
+        if quiet and (self.muzzle_velocity.get().strip() or self.ballistic_coef.get().strip()):
+            return
+        try:
+            weight = int(self.bullet_weight.get()) if self.bullet_weight.get() else 0
+        except ValueError:
+            if not quiet:
+                messagebox.showerror("Error", "Bullet grain must be a whole number")
+            return
+        
+        def found(profile):
+            if profile is None:
+                if not quiet:
+                    messagebox.showinfo("Look Up Saved Load", "No load has been saved for this bullet yet")
+                return
+            velocity, ballistic_coef, drag_function = profile
+            self.muzzle_velocity.set(f"{velocity:g}")
+            self.ballistic_coef.set(f"{ballistic_coef:g}")
+            self.drag_function.set(drag_function)
+        self.db_request('bullet_profile', self.bullet_manufacturer.get(), self.bullet_model.get(), weight,
+                        callback=found)
+
+    @instrumentation.timed("ui.save_calibration")
+    def save_calibration(self, distance, horizontal, vertical, adjustment_type, bullet_manufacturer, bullet_model, bullet_weight,
+                         stats=None):
+        """Save calibration data, and the group statistics if given, to database"""
 
         user_id = self.current_user if self.current_user else 1  # Default to user 1 if no user system
-        self.cursor.execute('''
-            INSERT INTO calibration_history 
-            (user_id, date, target_distance, horizontal_adjustment, vertical_adjustment,
-            adjustment_type, bullet_manufacturer, bullet_model, bullet_weight)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, datetime.now(), distance, horizontal, vertical, adjustment_type, bullet_manufacturer, bullet_model, bullet_weight))
-        self.conn.commit()
-        self.load_history()
+        record = dict(user_id=user_id, date=datetime.now(), target_distance=distance,
+                      horizontal_adjustment=horizontal, vertical_adjustment=vertical,
+                      adjustment_type=adjustment_type, bullet_manufacturer=bullet_manufacturer,
+                      bullet_model=bullet_model, bullet_weight=bullet_weight)
+        if stats is not None:
+            record.update(statistics_record(stats))
+        self.db_request('add_calibration', **record)
+        
+        # Show the new row without re-reading the history, unless it is filtered
+        # (or the History tab has not been built yet, in which case it loads it)
+        if self.history_tree is not None and not self.history_query:
+            self.history_tree.insert('', 0, values=self.format_history_row(
+                (None, None, record['date'].strftime('%Y-%m-%d %H:%M'), distance, horizontal, vertical,
+                 adjustment_type, bullet_manufacturer, bullet_model, bullet_weight,
+                 record.get('shot_count'), record.get('extreme_spread'), record.get('cep'))))
+
+    def format_history_row(self, row):
+        """Format a HistoryStore.page row for the history table"""
+
+        return (row[2], f"{row[3]} yards",
+                f"{row[4]:.2f} {row[6]}",
+                f"{row[5]:.2f} {row[6]}",
+                row[6], row[7], row[8], row[9],
+                row[10] if row[10] is not None else "",
+                f"{row[11]:.2f} in" if row[11] is not None else "",
+                f"{row[12]:.2f} in" if row[12] is not None else "")
 
     def load_history(self):
-        """Load and display calibration history"""
+        """Load and display the first page of calibration history matching the filters"""
+        
+        try:
+            self.history_query = self.history_filters()
+        except ValueError as e:
+            messagebox.showerror("Error", f"Invalid filter: {e}")
+            return
         
         # Clear existing items
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-        
-        # Load history from database
-        self.cursor.execute('''
-            SELECT date, target_distance, horizontal_adjustment, vertical_adjustment, adjustment_type,
-                    bullet_manufacturer, bullet_model, bullet_weight
-            FROM calibration_history
-            ORDER BY date DESC
-            LIMIT 50
-        ''')
-        
-        for row in self.cursor.fetchall():
-            date = datetime.strptime(row[0], '%Y-%m-%d %H:%M:%S.%f').strftime('%Y-%m-%d %H:%M')
-            self.history_tree.insert('', 'end', values=(date, f"{row[1]} yards", 
-                                                      f"{row[2]:.2f} {row[4]}", 
-                                                      f"{row[3]:.2f} {row[4]}", 
-                                                      row[4], row[5], row[6], row[7]))
+        self.history_tree.delete(*self.history_tree.get_children())
+        self.history_after = None
+        self.history_generation += 1
+        self.load_history_page()
+
+    def load_history_page(self):
+        """Request the next page of history after the last loaded row"""
+
+        self.history_loading = True
+        self.db_request('page', HISTORY_PAGE_SIZE, self.history_after, **self.history_query,
+                        callback=lambda rows, generation=self.history_generation: self.show_history_page(rows, generation))
+
+    @instrumentation.timed("ui.show_history_page")
+    def show_history_page(self, rows, generation):
+        """Append a page of history rows, unless the view was reloaded since it was requested"""
+
+        if generation != self.history_generation:
+            return
+        self.history_loading = False
+        for row in rows:
+            self.history_tree.insert('', 'end', values=self.format_history_row(row))
+        if rows:
+            self.history_after = (rows[-1][1], rows[-1][0])
+        self.history_more = len(rows) == HISTORY_PAGE_SIZE
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scope adjustment calculator")
+    parser.add_argument('--measure-startup', action='store_true',
+                        help=f"print the seconds until the window is drawn and exit, "
+                             f"failing if over {STARTUP_TARGET} s")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
     root = tk.Tk()
     app = ScopeAdjustmentApp(root)
-    root.mainloop()
\ No newline at end of file
+    if args.measure_startup:
+        root.update()
+        elapsed = time.perf_counter() - START_TIME
+        print(f"Window drawn in {elapsed:.3f} s (target {STARTUP_TARGET} s)")
+        app.on_close()
+        if elapsed > STARTUP_TARGET:
+            sys.exit(1)
+        return
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -10,25 +10,26 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # The optional JIT kernel and tools the app never imports would only
+    # make the bundle bigger and slower to load
+    excludes=['numba', 'llvmlite', 'matplotlib', 'scipy', 'pandas', 'IPython', 'pytest'],
     noarchive=False,
-    optimize=0,
+    optimize=1,
 )
 pyz = PYZ(a.pure)
 
+# One-folder build: a one-file build unpacks everything to a temporary
+# directory on every launch, which takes longer than starting the app
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='ScopeAdjustment',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,  # compressed libraries are decompressed again at every start
     console=True,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -36,3 +37,12 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='ScopeAdjustment',
+)
@@ -0,0 +1,330 @@
+import argparse
+import csv
+import json
+import math
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from bullet_drop_test import calculate_trajectories_batch
+from drag_models import drag_models, get_drag_model
+from group_stats import CENTER_METHODS, robust_center
+
+# Size of the target canvas in the app, in pixels
+CANVAS_SIZE = (500, 500)
+
+# Inches subtended at 100 yards by one unit of adjustment
+INCHES_PER_100_YARDS = {
+    'MOA': 1.047,
+    'MIL': 3.6,
+}
+
+# Exact angle of one unit of adjustment, used by the ballistic mode
+RADIANS_PER_UNIT = {
+    'MOA': math.pi / (180 * 60),
+    'MIL': 0.001,
+}
+
+
+def _angular(inches, distance, unit):
+    """
+    Convert an offset in inches at distance (yards) to MOA or MIL.
+    """
+    try:
+        per_100_yards = INCHES_PER_100_YARDS[unit]
+    except KeyError:
+        raise ValueError(f"Unknown adjustment unit {unit!r}, expected MOA or MIL") from None
+    return inches / (distance / 100) / per_100_yards
+
+
+def calculate_adjustment(shots, center, target_width, target_height, distance,
+                         unit="MOA", image_size=CANVAS_SIZE, center_method="mean", fliers=False):
+    """
+    Scope adjustment that moves the group's mean point of impact onto center.
+
+    shots are (x, y) pixel positions on an image of image_size pixels that
+    spans target_width x target_height inches; center defaults to the middle
+    of the image. distance is in yards. Positive horizontal means right and
+    positive vertical means up. The group center is the mean of the shots
+    unless center_method picks a robust estimate ("median", "trimmed"), and
+    fliers drops outlying shots first (see group_stats.robust_center).
+
+    Returns a dict with the horizontal/vertical correction in unit, the same
+    in inches on the target, and the group's mean position in pixels.
+    """
+    if len(shots) == 0:
+        raise ValueError("No shots marked!")
+    if distance <= 0:
+        raise ValueError("Target distance must be positive")
+
+    image_width, image_height = image_size
+    if center is None:
+        center = (image_width / 2, image_height / 2)
+    center_x, center_y = center
+
+    # Calculate the group's center (the average position of the shots by default)
+    (avg_x, avg_y), _ = robust_center(shots, center_method, fliers=fliers)
+
+    # Calculate difference from center in inches
+    adjustment_x = ((center_x - avg_x) / image_width) * target_width
+    adjustment_y = (-(center_y - avg_y) / image_height) * target_height
+
+    return {
+        'horizontal': float(_angular(adjustment_x, distance, unit)),
+        'vertical': float(_angular(adjustment_y, distance, unit)),
+        'unit': unit,
+        'horizontal_inches': float(adjustment_x),
+        'vertical_inches': float(adjustment_y),
+        'group_center': (float(avg_x), float(avg_y)),
+    }
+
+
+@lru_cache(maxsize=256)
+def ballistic_solution(velocity, ballistic_coef, distance, zero_range=None, sight_height=1.5,
+                       drag_function="G1", crosswind=0.0):
+    """
+    Solve a bullet profile's trajectory at distance (yards) for a rifle
+    zeroed at zero_range (default: distance) with the given sight height
+    (inches), in crosswind (mph, positive blows from left to right).
+
+    Returns a dict with the point of impact relative to the line of sight
+    (poi_inches, positive up), the wind drift (drift_inches, positive right)
+    and the inches the impact moves per radian of elevation change
+    (inches_per_radian), measured by re-running the solver with the bore
+    raised and lowered 1 MOA. Results are cached per profile, so repeated
+    adjustments for the same load are instant.
+    """
+    if velocity <= 0 or ballistic_coef <= 0:
+        raise ValueError("Velocity and ballistic coefficient must be positive")
+    if zero_range is None:
+        zero_range = distance
+
+    # bullet_drop_test starts the bullet on the line of sight. Here the bore is
+    # sight_height below it, so starting from that zero angle, raise the bore
+    # until the bullet climbs to the line of sight at zero_range (the height
+    # is nearly linear in the angle, so two Newton steps are plenty)
+    delta = RADIANS_PER_UNIT['MOA']
+    angle = float(calculate_trajectories_batch(velocity, ballistic_coef, zero_range, zero_range,
+                                               0.0, drag_function)['zero_angle'])
+    for _ in range(2):
+        low, high = calculate_trajectories_batch(velocity, ballistic_coef, None, zero_range, 0.0, drag_function,
+                                                 launch_angle=[angle, angle + delta],
+                                                 exact_range=True)['drop_inches']
+        angle += (sight_height - low) * delta / (high - low)
+
+    # Bore lowered, as zeroed and raised 1 MOA, measured at exactly distance: the
+    # step past it is up to 3 feet further, which skews short-range results
+    solved = calculate_trajectories_batch(velocity, ballistic_coef, None, distance, 0.0, drag_function,
+                                          crosswind=crosswind, launch_angle=[angle - delta, angle, angle + delta],
+                                          exact_range=True)
+    low, height, high = solved['drop_inches']
+
+    return {
+        'poi_inches': float(height - sight_height),
+        'drift_inches': float(solved['windage_inches'][1]),
+        'inches_per_radian': float((high - low) / (2 * delta)),
+        'zero_angle': float(angle),
+        'velocity_fps': float(solved['velocity_fps'][1]),
+        'time_of_flight': float(solved['time_of_flight'][1]),
+    }
+
+
+def calculate_ballistic_adjustment(shots, center, target_width, target_height, distance,
+                                   velocity, ballistic_coef, unit="MOA", image_size=CANVAS_SIZE,
+                                   center_method="mean", fliers=False, zero_range=None,
+                                   sight_height=1.5, drag_function="G1", crosswind=0.0):
+    """
+    Scope adjustment computed with the trajectory solver for a known load.
+
+    Takes the same arguments as calculate_adjustment plus the load's muzzle
+    velocity (fps), ballistic coefficient and drag function. Instead of
+    assuming the group should land on center and that one MOA is 1.047
+    inches per 100 yards, the group is moved to where the bullet should
+    hit at distance for a rifle zeroed at zero_range (so a 25 yard target
+    can be used to set a 200 yard zero), the drift of the crosswind the
+    group was shot in is taken out so the result is a no-wind zero, and the
+    elevation change is converted to unit with the solver's sensitivity at
+    that distance.
+
+    Returns the calculate_adjustment dict, with the corrections replaced,
+    plus poi_inches and drift_inches from ballistic_solution.
+    """
+    if unit not in RADIANS_PER_UNIT:
+        raise ValueError(f"Unknown adjustment unit {unit!r}, expected MOA or MIL")
+    get_drag_model(drag_function)  # fail early on an unknown model
+
+    result = calculate_adjustment(shots, center, target_width, target_height, distance,
+                                  unit, image_size, center_method, fliers)
+    solution = ballistic_solution(float(velocity), float(ballistic_coef), float(distance),
+                                  None if zero_range is None else float(zero_range),
+                                  float(sight_height), drag_function, float(crosswind))
+
+    # Inches to move the impact at the target: onto the zero's point of impact,
+    # and back by the wind drift the group was shot with
+    adjustment_x = result['horizontal_inches'] + solution['drift_inches']
+    adjustment_y = result['vertical_inches'] + solution['poi_inches']
+
+    # Turning the rifle sideways moves the impact by the range times the angle
+    per_unit = RADIANS_PER_UNIT[unit]
+    result.update({
+        'horizontal': adjustment_x / (distance * 36 * per_unit),
+        'vertical': adjustment_y / (solution['inches_per_radian'] * per_unit),
+        'horizontal_inches': adjustment_x,
+        'vertical_inches': adjustment_y,
+        'poi_inches': solution['poi_inches'],
+        'drift_inches': solution['drift_inches'],
+    })
+    return result
+
+
+def calculate_adjustments_batch(shots, groups, centers, target_width, target_height, distance,
+                                unit="MOA", image_size=CANVAS_SIZE):
+    """
+    Vectorized calculate_adjustment for many shot groups at once.
+
+    shots is an (N, 2) array of every shot and groups an (N,) array giving
+    the group number (0..G-1) of each shot, so groups can have different
+    sizes. centers is a (G, 2) array, a single (x, y) shared by all groups,
+    or None for the image center. target_width, target_height, distance and
+    image_size may be scalars or per-group arrays.
+
+    Returns a dict of (G,) arrays; groups without shots come back as NaN.
+    """
+    points = np.asarray(shots, dtype=float).reshape(-1, 2)
+    groups = np.asarray(groups, dtype=np.intp)
+    if groups.shape != (len(points),):
+        raise ValueError("groups must give one group number per shot")
+    group_count = int(groups.max()) + 1 if len(groups) else 0
+
+    # Mean point of impact per group
+    counts = np.bincount(groups, minlength=group_count).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_x = np.bincount(groups, points[:, 0], minlength=group_count) / counts
+        avg_y = np.bincount(groups, points[:, 1], minlength=group_count) / counts
+
+    image_size = np.broadcast_to(np.asarray(image_size, dtype=float), (group_count, 2))
+    if centers is None:
+        centers = image_size / 2
+    centers = np.broadcast_to(np.asarray(centers, dtype=float), (group_count, 2))
+    distance = np.broadcast_to(np.asarray(distance, dtype=float), (group_count,))
+    if np.any(distance <= 0):
+        raise ValueError("Target distance must be positive")
+
+    adjustment_x = ((centers[:, 0] - avg_x) / image_size[:, 0]) * target_width
+    adjustment_y = (-(centers[:, 1] - avg_y) / image_size[:, 1]) * target_height
+
+    return {
+        'horizontal': _angular(adjustment_x, distance, unit),
+        'vertical': _angular(adjustment_y, distance, unit),
+        'unit': unit,
+        'horizontal_inches': adjustment_x,
+        'vertical_inches': adjustment_y,
+        'group_center': np.column_stack((avg_x, avg_y)),
+        'shot_count': counts.astype(int),
+    }
+
+
+def read_groups(path):
+    """
+    Read shot groups from a JSON list of objects with a "shots" list of
+    [x, y] pairs and optional "id", "center", "target_width",
+    "target_height", "distance", "unit" and "image_size" fields, or from a
+    CSV with group, x and y columns.
+    """
+    with open(path, newline='') as f:
+        if path.lower().endswith('.json'):
+            return json.load(f)
+
+        groups = {}
+        for row in csv.DictReader(f):
+            groups.setdefault(row['group'], []).append([float(row['x']), float(row['y'])])
+    return [{'id': group, 'shots': shots} for group, shots in groups.items()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculate scope adjustments for shot groups without the GUI")
+    parser.add_argument('groups', help="JSON or CSV file of shot groups")
+    parser.add_argument('-o', '--output', help="CSV output file (default: stdout)")
+    parser.add_argument('--width', type=float, help="target width in inches")
+    parser.add_argument('--height', type=float, help="target height in inches")
+    parser.add_argument('--distance', type=float, help="target distance in yards")
+    parser.add_argument('--unit', choices=sorted(INCHES_PER_100_YARDS), default="MOA")
+    parser.add_argument('--center-method', choices=CENTER_METHODS, default="mean")
+    parser.add_argument('--reject-fliers', action='store_true')
+    parser.add_argument('--image-size', type=float, nargs=2, default=CANVAS_SIZE,
+                        metavar=('WIDTH', 'HEIGHT'), help="image size in pixels (default: 500 500)")
+    ballistic = parser.add_argument_group("ballistic mode", "use the trajectory solver when --velocity and --bc are given")
+    ballistic.add_argument('--velocity', type=float, help="muzzle velocity in fps")
+    ballistic.add_argument('--bc', type=float, help="ballistic coefficient")
+    ballistic.add_argument('--drag-function', choices=drag_models(), default="G1")
+    ballistic.add_argument('--zero-range', type=float, help="yards the rifle should be zeroed at (default: --distance)")
+    ballistic.add_argument('--sight-height', type=float, default=1.5, help="inches (default: 1.5)")
+    ballistic.add_argument('--crosswind', type=float, default=0.0,
+                           help="mph the groups were shot in, positive from the left (default: 0)")
+    args = parser.parse_args(argv)
+    if (args.velocity is None) != (args.bc is None):
+        parser.error("--velocity and --bc must be given together")
+
+    try:
+        groups = read_groups(args.groups)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"Could not read {args.groups}: {e}")
+
+    # Check the fields every group needs before calculating anything
+    defaults = {'target_width': ('--width', args.width), 'target_height': ('--height', args.height),
+                'distance': ('--distance', args.distance)}
+    for i, group in enumerate(groups):
+        if 'shots' not in group:
+            parser.error(f"Group {group.get('id', i)} has no shots list")
+        for field, (option, default) in defaults.items():
+            if group.get(field, default) is None:
+                parser.error(f"Group {group.get('id', i)} has no {field}; give it in the file or with {option}")
+
+    # Calculate every group first so a bad one leaves no partial output behind
+    rows = []
+    for i, group in enumerate(groups):
+        try:
+            arguments = (
+                group['shots'],
+                group.get('center'),
+                group.get('target_width', args.width),
+                group.get('target_height', args.height),
+                group.get('distance', args.distance),
+            )
+            if args.velocity is not None:
+                result = calculate_ballistic_adjustment(
+                    *arguments, args.velocity, args.bc,
+                    group.get('unit', args.unit),
+                    group.get('image_size', args.image_size),
+                    args.center_method,
+                    args.reject_fliers,
+                    args.zero_range,
+                    args.sight_height,
+                    args.drag_function,
+                    args.crosswind,
+                )
+            else:
+                result = calculate_adjustment(
+                    *arguments,
+                    group.get('unit', args.unit),
+                    group.get('image_size', args.image_size),
+                    args.center_method,
+                    args.reject_fliers,
+                )
+        except (TypeError, ValueError, IndexError) as e:
+            parser.error(f"Group {group.get('id', i)}: {e}")
+        rows.append([group.get('id', i), len(group['shots']),
+                     f"{result['horizontal']:.2f}", f"{result['vertical']:.2f}", result['unit']])
+
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        writer = csv.writer(output)
+        writer.writerow(['id', 'shots', 'horizontal', 'vertical', 'unit'])
+        writer.writerows(rows)
+    finally:
+        if args.output:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import numpy as np
+
+# Standard (ICAO sea-level) conditions
+STANDARD_TEMPERATURE = 59.0   # °F
+STANDARD_PRESSURE = 29.92     # inHg
+STANDARD_DENSITY = 0.0023769  # slug/ft³
+LAPSE_RATE = 0.00356616       # °F per foot
+
+
+class Atmosphere:
+    """
+    Air density and speed of sound for the given shooting conditions.
+
+    temperature is in °F, pressure is station pressure in inHg, altitude is
+    in feet and humidity is relative (0-1). A missing temperature or pressure
+    is taken from the standard atmosphere at the given altitude. Any of the
+    values may be NumPy arrays, in which case density and speed_of_sound are
+    arrays too.
+    """
+
+    def __init__(self, temperature=None, pressure=None, altitude=0.0, humidity=0.0):
+        altitude = np.asarray(altitude, dtype=float)
+        if temperature is None:
+            temperature = STANDARD_TEMPERATURE - LAPSE_RATE * altitude
+        if pressure is None:
+            pressure = STANDARD_PRESSURE * (1 - 6.8753e-6 * altitude) ** 5.2559
+
+        self.temperature = np.asarray(temperature, dtype=float)
+        self.pressure = np.asarray(pressure, dtype=float)
+        self.altitude = altitude
+        self.humidity = np.asarray(humidity, dtype=float)
+
+        rankine = self.temperature + 459.67
+        celsius = (self.temperature - 32) / 1.8
+
+        # Water vapour is lighter than dry air, so humid air is less dense
+        saturation = 6.1078 * 10 ** (7.5 * celsius / (celsius + 237.3)) * 0.02953  # inHg
+        vapour = self.humidity * saturation
+
+        self.density = (STANDARD_DENSITY * (self.pressure / STANDARD_PRESSURE)
+                        * ((STANDARD_TEMPERATURE + 459.67) / rankine)
+                        * (1 - 0.378 * vapour / self.pressure))
+        self.speed_of_sound = 49.0223 * np.sqrt(rankine)  # ft/s
+
+    def __repr__(self):
+        return (f"Atmosphere(temperature={self.temperature}, pressure={self.pressure}, "
+                f"altitude={self.altitude}, humidity={self.humidity})")
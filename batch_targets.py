@@ -0,0 +1,140 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from adjustment_core import INCHES_PER_100_YARDS, calculate_adjustment
+from group_stats import group_statistics
+from history_store import DEFAULT_DB_PATH, HistoryStore, statistics_record
+from shot_detection import detect_shots
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+
+# Fewer detected shots than this is more likely a detection failure than a group
+MIN_SHOTS = 3
+
+
+def load_image(path, max_size):
+    """
+    Decode an image no larger than needed for max_size pixels on its long side.
+
+    For JPEGs draft mode lets the decoder skip straight to a 1/2, 1/4 or 1/8
+    scale, which is much faster than decoding the full image and resizing.
+    Color is kept so detect_shots can tell pen circles from holes.
+    """
+    image = Image.open(path)
+    image.draft('RGB', (max_size, max_size))
+    image = image.convert('RGB')
+    image.thumbnail((max_size, max_size))
+    return image
+
+
+def process_image(path, max_size, target_width, target_height, distance, unit, min_shots=MIN_SHOTS):
+    """
+    Worker entry point: decode, detect shots and compute the adjustment for one image.
+    Returns a result dict; failures, including fewer than min_shots detected
+    shots, are reported in its 'error' field.
+    """
+    result = {'path': path, 'shots': 0, 'horizontal': None, 'vertical': None, 'unit': unit,
+              'stats': None, 'error': None}
+    try:
+        image = load_image(path, max_size)
+        shots = detect_shots(image)
+        result['shots'] = len(shots)
+        if not shots:
+            result['error'] = "no shots detected"
+            return result
+        if len(shots) < min_shots:
+            result['error'] = f"only {len(shots)} shots detected, need {min_shots}"
+            return result
+        adjustment = calculate_adjustment(shots, None, target_width, target_height,
+                                          distance, unit, image.size)
+        result['horizontal'] = adjustment['horizontal']
+        result['vertical'] = adjustment['vertical']
+        result['stats'] = group_statistics(shots, (target_width / image.width, target_height / image.height))
+    except (OSError, ValueError) as e:
+        result['error'] = str(e)
+    return result
+
+
+def process_directory(directory, target_width, target_height, distance, unit="MOA",
+                      max_size=1600, workers=None, min_shots=MIN_SHOTS):
+    """
+    Process every image in directory across a process pool, in file name order.
+    """
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(process_image, paths,
+                                 [max_size] * len(paths),
+                                 [target_width] * len(paths),
+                                 [target_height] * len(paths),
+                                 [distance] * len(paths),
+                                 [unit] * len(paths),
+                                 [min_shots] * len(paths)))
+
+
+def save_results(db_path, results, distance, user_id=1,
+                 bullet_manufacturer="", bullet_model="", bullet_weight=0):
+    """
+    Insert every successful result into calibration_history in one transaction.
+    Returns the number of rows written.
+    """
+    records = [dict(user_id=user_id, target_distance=distance,
+                    horizontal_adjustment=r['horizontal'], vertical_adjustment=r['vertical'],
+                    adjustment_type=r['unit'], bullet_manufacturer=bullet_manufacturer,
+                    bullet_model=bullet_model, bullet_weight=bullet_weight, **statistics_record(r['stats']))
+               for r in results if r['error'] is None]
+
+    with HistoryStore(db_path) as store:
+        return store.add_calibrations(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detect shots and compute scope adjustments for a directory of targets")
+    parser.add_argument('directory', help="directory of target images")
+    parser.add_argument('--width', type=float, required=True, help="target width in inches")
+    parser.add_argument('--height', type=float, required=True, help="target height in inches")
+    parser.add_argument('--distance', type=float, required=True, help="target distance in yards")
+    parser.add_argument('--unit', choices=sorted(INCHES_PER_100_YARDS), default="MOA")
+    parser.add_argument('--max-size', type=int, default=1600,
+                        help="downscale images to this many pixels on the long side (default: 1600)")
+    parser.add_argument('--min-shots', type=int, default=MIN_SHOTS,
+                        help=f"report images with fewer detected shots as errors (default: {MIN_SHOTS})")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="calibration database (default: the app's)")
+    parser.add_argument('--no-save', action='store_true', help="only print the results")
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--bullet-manufacturer', default="")
+    parser.add_argument('--bullet-model', default="")
+    parser.add_argument('--bullet-weight', type=int, default=0, help="grains")
+    args = parser.parse_args(argv)
+
+    results = process_directory(args.directory, args.width, args.height, args.distance,
+                                args.unit, args.max_size, args.workers, args.min_shots)
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['image', 'shots', 'horizontal', 'vertical', 'unit', 'error'])
+    for r in results:
+        writer.writerow([os.path.basename(r['path']), r['shots'],
+                         '' if r['horizontal'] is None else f"{r['horizontal']:.2f}",
+                         '' if r['vertical'] is None else f"{r['vertical']:.2f}",
+                         r['unit'], r['error'] or ''])
+
+    if not args.no_save:
+        try:
+            saved = save_results(args.db, results, args.distance, args.user_id,
+                                 args.bullet_manufacturer, args.bullet_model, args.bullet_weight)
+        except sqlite3.Error as e:
+            parser.exit(1, f"Could not save to {args.db} ({e})\n")
+        print(f"Saved {saved} of {len(results)} results to {args.db}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+import adjustment_core
+import bullet_drop_test as ballistics
+import monte_carlo
+
+# Load used by every ballistics case
+LOAD = {
+    'initial_velocity': 2750,    # fps
+    'ballistic_coef': 0.485,     # G1 BC
+    'zero_range': 100,           # yards
+    'sight_height': 1.5,         # inches
+    'drag_function': "G1",
+}
+
+TARGET_RANGES = (100, 500, 1000, 2000)  # yards
+SHOT_COUNTS = (10, 1000, 100000)
+
+
+def _zero_case(solver):
+    def run():
+        result = ballistics.solve_zero_angle(**LOAD, solver=solver)
+        return {'iterations': result['iterations'], 'steps': result['steps']}
+    return run
+
+
+def _trajectory_case(target_range, **options):
+    def run():
+        result = ballistics.calculate_trajectory(**LOAD, target_range=target_range,
+                                                 cache=None, **options)
+        return {'steps': result['steps'], 'zero_iterations': result['zero_iterations']}
+    return run
+
+
+def _cached_trajectory_case(target_range):
+    cache = ballistics.ZeroAngleCache()
+    ballistics.calculate_trajectory(**LOAD, target_range=target_range, cache=cache)
+
+    def run():
+        result = ballistics.calculate_trajectory(**LOAD, target_range=target_range, cache=cache)
+        return {'steps': result['steps'], 'zero_iterations': result['zero_iterations']}
+    return run
+
+
+def _batch_case(loads, target_range, **options):
+    velocities = np.linspace(2400, 3200, loads)
+
+    def run():
+        ballistics.calculate_trajectories_batch(velocities, LOAD['ballistic_coef'],
+                                                LOAD['zero_range'], target_range,
+                                                LOAD['sight_height'], LOAD['drag_function'],
+                                                **options)
+        return {'loads': loads}
+    return run
+
+
+def _adjustment_case(shots):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 500, (shots, 2))
+
+    def run():
+        adjustment_core.calculate_adjustment(points, None, 10, 10, 100, "MOA")
+        return {'shots': shots}
+    return run
+
+
+def _adjustment_batch_case(groups, shots_per_group):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 500, (groups * shots_per_group, 2))
+    group_index = np.repeat(np.arange(groups), shots_per_group)
+
+    def run():
+        adjustment_core.calculate_adjustments_batch(points, group_index, None, 10, 10, 100, "MOA")
+        return {'groups': groups, 'shots': groups * shots_per_group}
+    return run
+
+
+def _monte_carlo_case(draws):
+    def run():
+        result = monte_carlo.simulate_hits(**LOAD, target_range=500, target_width=10, target_height=10,
+                                           velocity_sd=10, bc_sd=0.01, wind_sd=3, dispersion_moa=1,
+                                           draws=draws, seed=0, workers=1)
+        return {'draws': draws, 'hit_probability': result['hit_probability']}
+    return run
+
+
+def _startup_case(module):
+    # A fresh interpreter each run, so nothing is already imported
+    def run():
+        subprocess.run([sys.executable, '-c', f"import {module}"], check=True)
+        return {'module': module}
+    return run
+
+
+def benchmark_cases():
+    """
+    All benchmark cases as (name, callable) pairs. Each callable returns a
+    dict of extra metrics such as step counts.
+    """
+    cases = [(f"find_zero_angle[{solver}]", _zero_case(solver))
+             for solver in ballistics.ZERO_SOLVERS]
+    cases.append(("startup[import ScopeAdjustment]", _startup_case("ScopeAdjustment")))
+
+    for target_range in TARGET_RANGES:
+        cases.append((f"calculate_trajectory[{target_range}yd]", _trajectory_case(target_range)))
+    for target_range in TARGET_RANGES:
+        cases.append((f"calculate_trajectory[{target_range}yd,rk45,secant]",
+                      _trajectory_case(target_range, integrator="rk45", solver="secant")))
+    for target_range in TARGET_RANGES:
+        cases.append((f"calculate_trajectory[{target_range}yd,interval=25]",
+                      _trajectory_case(target_range, sample_interval=25, as_array=True)))
+    cases.append(("calculate_trajectory[1000yd,cached zero]", _cached_trajectory_case(1000)))
+
+    cases.append(("calculate_trajectories_batch[1000 loads,1000yd]", _batch_case(1000, 1000)))
+    cases.append(("calculate_trajectories_batch[1000 loads,1000yd,wind]",
+                  _batch_case(1000, 1000, crosswind=10, stability_factor=1.5)))
+    cases.append(("simulate_hits[10000 draws,500yd]", _monte_carlo_case(10000)))
+
+    for shots in SHOT_COUNTS:
+        cases.append((f"calculate_adjustment[{shots} shots]", _adjustment_case(shots)))
+    cases.append(("calculate_adjustments_batch[10000 groups x 10 shots]",
+                  _adjustment_batch_case(10000, 10)))
+    return cases
+
+
+def run_case(run, repeat):
+    """
+    Time run() repeat times, then run it once more under tracemalloc for the peak memory.
+    """
+    times = []
+    metrics = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        metrics = run()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'best_seconds': min(times),
+        'mean_seconds': sum(times) / len(times),
+        'repeat': repeat,
+        'peak_memory_bytes': peak,
+        **metrics,
+    }
+
+
+def run_benchmarks(repeat=5, select=None):
+    """
+    Run every case whose name contains select (all cases when None).
+    """
+    results = {}
+    for name, run in benchmark_cases():
+        if select and select not in name:
+            continue
+        results[name] = run_case(run, repeat)
+        print(f"{name:55s} {results[name]['best_seconds'] * 1000:10.2f} ms "
+              f"{results[name]['peak_memory_bytes'] / 1024:10.0f} KiB", file=sys.stderr)
+
+    return {
+        'date': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(current, baseline_path, threshold=0.10):
+    """
+    Print each case's best time relative to a saved run and return the names
+    that got slower by more than threshold.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    for name, result in current['results'].items():
+        if name not in baseline:
+            continue
+        ratio = result['best_seconds'] / baseline[name]['best_seconds']
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:55s} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ballistics and adjustment hot paths")
+    parser.add_argument('-o', '--output', help="write results to this JSON file")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="timed runs per case (default: 5)")
+    parser.add_argument('-k', '--select', help="only run cases whose name contains this text")
+    parser.add_argument('--compare', metavar='JSON', help="compare against a previous results file")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown counted as a regression (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat, args.select)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
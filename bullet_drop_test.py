@@ -1,167 +1,1038 @@
 import math
+import sqlite3
+from collections import OrderedDict, namedtuple
+
 import numpy as np
 
-def find_zero_angle(
+from atmosphere import Atmosphere
+import instrumentation
+import jit_kernel
+from drag_models import get_drag_model
+
+# Constants
+GRAVITY = 32.174          # ft/s²
+AIR_DENSITY = 0.0023769   # slug/ft³ (standard sea-level air)
+SPEED_OF_SOUND = 1116.4   # ft/s
+TIME_STEP = 0.001         # s
+MPH_TO_FPS = 5280 / 3600
+
+# Retardation = AIR_DENSITY * v² * Cd * DRAG_FACTOR / BC for a G1/G7 BC in lb/in²,
+# i.e. ½ρv²·Cd·A/m with A/m = (π/4 in²) / (BC lb) converted to ft²/slug.
+DRAG_FACTOR = GRAVITY * math.pi / (8 * 144)
+
+# Integrators accepted by find_zero_angle and calculate_trajectory
+INTEGRATORS = ("euler", "rk4", "rk45")
+
+# Root finders accepted by find_zero_angle and calculate_trajectory
+ZERO_SOLVERS = ("bisection", "secant", "brent")
+
+# One point yielded by iter_trajectory
+TrajectorySample = namedtuple('TrajectorySample',
+                              ['range_yards', 'drop_inches', 'velocity_fps', 'time_of_flight'])
+
+# Record layout of calculate_trajectory(..., as_array=True)
+TRAJECTORY_DTYPE = np.dtype([
+    ('range_yards', 'f8'),
+    ('drop_inches', 'f8'),
+    ('velocity_fps', 'f8'),
+    ('time_of_flight', 'f8'),  # seconds
+])
+
+# Dormand–Prince 5(4) coefficients (the stage times are not needed: the
+# equations of motion do not depend on t)
+_DP_A = (
+    (),
+    (1/5,),
+    (3/40, 9/40),
+    (44/45, -56/15, 32/9),
+    (19372/6561, -25360/2187, 64448/6561, -212/729),
+    (9017/3168, -355/33, 46732/5247, 49/176, -5103/18656),
+    (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84),
+)
+_DP_B5 = (35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84, 0.0)
+_DP_B4 = (5179/57600, 0.0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40)
+
+
+def calculate_drag_coefficient(velocity, drag_model="G1"):
+    """
+    Drag coefficient at the given velocity (fps) from a registered drag table.
+    Works on a single velocity or a NumPy array of them.
+    """
+    return get_drag_model(drag_model)(velocity / SPEED_OF_SOUND)
+
+
+def _acceleration_function(ballistic_coef, drag_function="G1"):
+    """
+    Build the acceleration(vx, vy) -> (ax, ay) function used by _integrate.
+    The drag table is looked up once here rather than on every step.
+    """
+    drag_model = get_drag_model(drag_function)
+    k = AIR_DENSITY * DRAG_FACTOR / ballistic_coef
+
+    def acceleration(vx, vy):
+        v = math.sqrt(vx**2 + vy**2)
+        # drag * v_component / v, written without the division so v == 0 is safe
+        drag_over_v = k * v * drag_model(v / SPEED_OF_SOUND)
+        return -drag_over_v * vx, -(GRAVITY + drag_over_v * vy)
+
+    # What the compiled kernel needs to compute the same acceleration
+    acceleration.drag_model = drag_model
+    acceleration.k = k
+    return acceleration
+
+
+def _euler_step(accel, x, y, vx, vy, h):
+    """
+    One step of the original semi-implicit Euler update (velocity first).
+    """
+    ax, ay = accel(vx, vy)
+    vx = vx + ax * h
+    vy = vy + ay * h
+    return x + vx * h, y + vy * h, vx, vy
+
+
+def _rk4_step(accel, x, y, vx, vy, h):
+    """
+    One classic fourth-order Runge-Kutta step.
+    """
+    ax1, ay1 = accel(vx, vy)
+    vx2, vy2 = vx + 0.5 * h * ax1, vy + 0.5 * h * ay1
+    ax2, ay2 = accel(vx2, vy2)
+    vx3, vy3 = vx + 0.5 * h * ax2, vy + 0.5 * h * ay2
+    ax3, ay3 = accel(vx3, vy3)
+    vx4, vy4 = vx + h * ax3, vy + h * ay3
+    ax4, ay4 = accel(vx4, vy4)
+
+    x = x + h / 6 * (vx + 2 * vx2 + 2 * vx3 + vx4)
+    y = y + h / 6 * (vy + 2 * vy2 + 2 * vy3 + vy4)
+    vx = vx + h / 6 * (ax1 + 2 * ax2 + 2 * ax3 + ax4)
+    vy = vy + h / 6 * (ay1 + 2 * ay2 + 2 * ay3 + ay4)
+    return x, y, vx, vy
+
+
+def _dopri_step(accel, state, k1, h):
+    """
+    One Dormand–Prince step from state (x, y, vx, vy).
+
+    k1 is the derivative at state. Returns the fifth-order solution, the
+    difference to the embedded fourth-order solution and the derivative at
+    the new state (reused as k1 of the next step).
+    """
+    ks = [k1]
+    for i in range(1, 7):
+        row = _DP_A[i]
+        s = [state[j] + h * sum(a * k[j] for a, k in zip(row, ks)) for j in range(4)]
+        ax, ay = accel(s[2], s[3])
+        ks.append((s[2], s[3], ax, ay))
+
+    # Row 7 of A equals the fifth-order weights, so s is the new state
+    error = [h * sum((b5 - b4) * k[j] for b5, b4, k in zip(_DP_B5, _DP_B4, ks))
+             for j in range(4)]
+    return tuple(s), error, ks[6]
+
+
+def _integrate(accel, x, y, vx, vy, stop_range, integrator="euler",
+               dt=TIME_STEP, rtol=1e-6, atol=1e-6, inclusive=True, compiled=False):
+    """
+    Integrate a point-mass trajectory until it reaches stop_range (feet).
+
+    accel(vx, vy) returns the (ax, ay) acceleration. Yields (t, x, y, vx, vy)
+    after every accepted step; the last sample is the step that reaches the
+    stop range (x >= stop_range when inclusive, x > stop_range otherwise).
+
+    "euler" reproduces the original fixed-step update exactly. With compiled
+    it runs in the Numba kernel when installed (see jit_kernel), which
+    computes the whole path before yielding anything; only callers that
+    consume the path to a finite stop_range should ask for it. "rk4" uses a
+    fixed step of dt and "rk45" an adaptive Dormand–Prince step starting at
+    dt and controlled by rtol/atol; for these two the final step is
+    interpolated so it lands on stop_range instead of overshooting it.
+    """
+    if integrator not in INTEGRATORS:
+        raise ValueError(f"Unknown integrator {integrator!r}, expected one of {INTEGRATORS}")
+
+    def reached(x):
+        return _reached(x, stop_range, inclusive)
+
+    t = 0.0
+    if integrator == "euler":
+        if compiled and jit_kernel.enabled and math.isfinite(stop_range) and hasattr(accel, 'drag_model'):
+            path = jit_kernel.euler_path(accel.drag_model, accel.k, x, y, vx, vy, stop_range, dt, inclusive)
+            yield from map(tuple, path.tolist())
+            return
+        while True:
+            x, y, vx, vy = _euler_step(accel, x, y, vx, vy, dt)
+            t += dt
+            yield t, x, y, vx, vy
+            if reached(x):
+                return
+
+    if integrator == "rk4":
+        while True:
+            new = _rk4_step(accel, x, y, vx, vy, dt)
+            if reached(new[0]):
+                yield _interpolate_to_range(t, (x, y, vx, vy), dt, new, stop_range)
+                return
+            x, y, vx, vy = new
+            t += dt
+            yield t, x, y, vx, vy
+
+    # Adaptive Dormand–Prince
+    h = dt
+    state = (x, y, vx, vy)
+    k1 = (vx, vy) + accel(vx, vy)
+    while True:
+        new, error, k7 = _dopri_step(accel, state, k1, h)
+        err = max(abs(e) / (atol + rtol * max(abs(a), abs(b)))
+                  for e, a, b in zip(error, state, new))
+
+        if err <= 1.0:
+            if reached(new[0]):
+                yield _interpolate_to_range(t, state, h, new, stop_range)
+                return
+            state, k1 = new, k7
+            t += h
+            yield (t,) + state
+
+        # Standard step-size controller, limited to a 0.2x-5x change per step
+        factor = 5.0 if err == 0 else min(5.0, max(0.2, 0.9 * err ** -0.2))
+        h *= factor
+
+
+def _reached(x, stop_range, inclusive):
+    """
+    The stop test of _integrate: x >= stop_range when inclusive, else x > stop_range.
+    """
+    return x >= stop_range if inclusive else x > stop_range
+
+
+def _interpolate_to_range(t, start, h, end, stop_range):
+    """
+    Interpolate the step start -> end (taking h seconds) to x == stop_range.
+
+    The height and the time use cubic Hermite curves in x with slopes vy/vx
+    and 1/vx at both ends, the velocity is linear in the fraction of the step
+    covered.
+    """
+    x0, y0, vx0, vy0 = start
+    x1, y1, vx1, vy1 = end
+    span = x1 - x0
+    s = (stop_range - x0) / span if span > 0 else 1.0
+
+    s2, s3 = s * s, s * s * s
+    h00, h10 = 2 * s3 - 3 * s2 + 1, s3 - 2 * s2 + s
+    h01, h11 = -2 * s3 + 3 * s2, s3 - s2
+    y = h00 * y0 + h10 * vy0 / vx0 * span + h01 * y1 + h11 * vy1 / vx1 * span
+    elapsed = h10 * span / vx0 + h01 * h + h11 * span / vx1
+
+    return (t + elapsed, stop_range, y,
+            vx0 + s * (vx1 - vx0), vy0 + s * (vy1 - vy0))
+
+
+def _bisect(f, low, high, ftol, max_iter=50):
+    """
+    Original bisection search: returns the midpoint once |f| < ftol.
+    """
+    for _ in range(max_iter):  # usually converges within 20 iterations
+        mid = (low + high) / 2
+        value = f(mid)
+
+        if abs(value) < ftol:
+            return mid
+        elif value > 0:
+            high = mid
+        else:
+            low = mid
+
+    return (low + high) / 2
+
+
+def _secant(f, a0, a1, ftol, max_iter=50):
+    """
+    Secant iteration from the two starting angles a0 and a1.
+    """
+    f0, f1 = f(a0), f(a1)
+    for _ in range(max_iter):
+        if abs(f1) < ftol or f1 == f0:
+            break
+        a0, a1, f0 = a1, a1 - f1 * (a1 - a0) / (f1 - f0), f1
+        f1 = f(a1)
+    return a1
+
+
+def _brent(f, a, b, ftol, xtol=1e-12, max_iter=50):
+    """
+    Brent's method on the bracket [a, b] (inverse quadratic interpolation
+    with a bisection fallback), stopping once |f| < ftol.
+    """
+    fa, fb = f(a), f(b)
+    if fa * fb > 0:
+        raise ValueError(f"Zero angle is not bracketed by [{a}, {b}] radians")
+
+    c, fc = b, fb
+    d = e = b - a
+    for _ in range(max_iter):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+
+        tol = 2 * np.finfo(float).eps * abs(b) + 0.5 * xtol
+        m = 0.5 * (c - b)
+        if abs(m) <= tol or abs(fb) < ftol:
+            return b
+
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                p, q = 2 * m * s, 1 - s
+            else:
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, m)
+        fb = f(b)
+
+    return b
+
+
+def _truncate_path(path, stop_range, interpolated, inclusive=False):
+    """
+    Cut the raw (t, x, y, vx, vy) samples of a zeroing run to where a
+    trajectory run to stop_range (feet) would have stopped, i.e. the first
+    sample that reaches stop_range under the same test as
+    _integrate(..., inclusive). For interpolating integrators that sample is
+    replaced by the interpolated point at stop_range.
+
+    Returns None if the path cannot reproduce that run exactly.
+    """
+    for i, sample in enumerate(path):
+        if interpolated and i == len(path) - 1:
+            # The zeroing run's own interpolated end point, placed exactly on
+            # the zero range; it is the trajectory's end when the ranges match
+            return path if sample[1] == stop_range else None
+        if _reached(sample[1], stop_range, inclusive):
+            if not interpolated:
+                return path[:i + 1]
+            if i > 0:
+                prev = path[i - 1]
+                return path[:i] + [_interpolate_to_range(prev[0], prev[1:], sample[0] - prev[0],
+                                                         sample[1:], stop_range)]
+            return None
+    return None
+
+
+@instrumentation.timed("solver.solve_zero_angle")
+def solve_zero_angle(
     initial_velocity,     # fps
     ballistic_coef,       
     zero_range,          # yards
     sight_height,        # inches
-    drag_function="G1"
+    drag_function="G1",
+    integrator="euler",  # "euler", "rk4" or "rk45"
+    dt=TIME_STEP,        # seconds, initial step for "rk45"
+    rtol=1e-6,           # "rk45" only
+    atol=1e-6,           # "rk45" only
+    solver="bisection"   # "bisection", "secant" or "brent"
 ):
     """
-    Find the initial angle needed to zero the rifle at the specified range.
-    Uses binary search to find the correct angle.
+    Find the initial angle needed to zero the rifle and report how it was found.
+
+    Every solver iteration runs a full simulation to the zero range. The
+    original bisection takes around 20 of them; secant and Brent usually need
+    only 3-6 because the height at the zero range is almost linear in the
+    launch angle.
+
+    Returns a dict with the angle (radians), the number of iterations
+    (simulations), the total integration steps, and the raw
+    (t, x, y, vx, vy) samples of the simulation at the returned angle, which
+    is None if that angle was never simulated.
     """
+    if solver not in ZERO_SOLVERS:
+        raise ValueError(f"Unknown solver {solver!r}, expected one of {ZERO_SOLVERS}")
+
     # Convert units
     sight_height = sight_height / 12  # convert to feet
     zero_range = zero_range * 3       # convert to feet
     
-    # Constants
-    GRAVITY = 32.174      # ft/s²
-    AIR_DENSITY = 0.0023769  # lb/ft³
-    
-    def calculate_drag_coefficient(velocity, drag_model="G1"):
-        mach = velocity / 1116.4
-        if drag_model == "G1":
-            if mach < 0.7:
-                return 0.2
-            elif mach < 1.2:
-                return 0.25 + (mach - 0.7) * 0.5
-            else:
-                return 0.52
-        else:  # G7
-            if mach < 0.7:
-                return 0.1
-            elif mach < 1.2:
-                return 0.15 + (mach - 0.7) * 0.3
-            else:
-                return 0.3
+    acceleration = _acceleration_function(ballistic_coef, drag_function)
+
+    target_height = sight_height  # at zero range, we want to hit the sight line
+    stats = {'iterations': 0, 'steps': 0}
+    best = {'miss': math.inf, 'angle': None, 'path': None}
 
     def simulate_to_zero(angle):
-        dt = 0.001
-        x = 0.0
-        y = sight_height
         vx = initial_velocity * math.cos(angle)
         vy = initial_velocity * math.sin(angle)
-        
-        while x <= zero_range:
-            v = math.sqrt(vx**2 + vy**2)
-            cd = calculate_drag_coefficient(v, drag_function)
-            drag = (AIR_DENSITY * v**2 * cd) / (ballistic_coef * 2)
-            
-            drag_x = drag * vx / v if v > 0 else 0
-            drag_y = drag * vy / v if v > 0 else 0
-            
-            vx = vx - (drag_x * dt)
-            vy = vy - (GRAVITY + drag_y) * dt
-            
-            x = x + vx * dt
-            y = y + vy * dt
-            
-            if x >= zero_range:
-                return y
-        
-        return y
-
-    # Binary search for the correct angle
-    angle_low = -0.1  # radians
-    angle_high = 0.1  # radians
-    target_height = sight_height  # at zero range, we want to hit the sight line
-    
-    for _ in range(50):  # usually converges within 20 iterations
-        angle_mid = (angle_low + angle_high) / 2
-        height = simulate_to_zero(angle_mid)
-        
-        if abs(height - target_height) < 0.0001:  # feet
-            return angle_mid
-        elif height > target_height:
-            angle_high = angle_mid
-        else:
-            angle_low = angle_mid
-            
-    return (angle_low + angle_high) / 2
 
-def calculate_trajectory(
+        path = list(_integrate(acceleration, 0.0, sight_height, vx, vy, zero_range,
+                               integrator, dt, rtol, atol, inclusive=True, compiled=True))
+        stats['iterations'] += 1
+        stats['steps'] += len(path)
+
+        miss = path[-1][2] - target_height
+        if abs(miss) < best['miss']:
+            best.update(miss=abs(miss), angle=angle, path=path)
+        return miss
+
+    ftol = 0.0001  # feet
+    if solver == "bisection":
+        angle = _bisect(simulate_to_zero, -0.1, 0.1, ftol)  # radians
+    elif solver == "secant":
+        angle = _secant(simulate_to_zero, 0.0, 0.001, ftol)
+    else:
+        angle = _brent(simulate_to_zero, -0.1, 0.1, ftol)
+
+    instrumentation.count("solver.zero_iterations", stats['iterations'])
+    instrumentation.count("solver.zero_steps", stats['steps'])
+    return {
+        'angle': angle,
+        'iterations': stats['iterations'],
+        'steps': stats['steps'],
+        'path': best['path'] if best['angle'] == angle else None
+    }
+
+
+def find_zero_angle(
     initial_velocity,     # fps
-    ballistic_coef,       
+    ballistic_coef,
     zero_range,          # yards
-    target_range,        # yards
     sight_height,        # inches
-    drag_function="G1"
+    drag_function="G1",
+    integrator="euler",  # "euler", "rk4" or "rk45"
+    dt=TIME_STEP,        # seconds, initial step for "rk45"
+    rtol=1e-6,           # "rk45" only
+    atol=1e-6,           # "rk45" only
+    solver="bisection"   # "bisection", "secant" or "brent"
 ):
     """
-    Calculate bullet trajectory with proper zeroing.
+    Find the initial angle needed to zero the rifle at the specified range.
+    Uses binary search to find the correct angle unless another solver is given.
     """
-    # Find the initial angle needed for zeroing
-    initial_angle = find_zero_angle(
+    return solve_zero_angle(initial_velocity, ballistic_coef, zero_range, sight_height,
+                            drag_function, integrator, dt, rtol, atol, solver)['angle']
+
+class ZeroAngleCache:
+    """
+    LRU cache of solved zero angles, optionally backed by a SQLite file.
+
+    Keys are the load parameters rounded to the quanta below, plus the drag
+    model and the integrator/solver settings, so loads that only differ by
+    float noise share an entry. The angle itself is always solved with the
+    exact parameters of the first miss.
+    """
+
+    # Rounding steps for the key: fps, BC, yards, inches
+    QUANTA = (0.1, 0.0001, 0.01, 0.001)
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._entries = OrderedDict()
+        self._conn = None
+
+        if path is not None:
+            self._conn = sqlite3.connect(path)
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS zero_angles (
+                    key TEXT PRIMARY KEY,
+                    angle FLOAT
+                )
+            ''')
+            self._conn.commit()
+
+    def make_key(self, initial_velocity, ballistic_coef, zero_range, sight_height,
+                 drag_function, *settings):
+        """
+        Build the cache key for a load; settings are the integrator/solver options.
+        """
+        params = (initial_velocity, ballistic_coef, zero_range, sight_height)
+        quantized = tuple(round(value / step) for value, step in zip(params, self.QUANTA))
+        return quantized + (drag_function,) + settings
+
+    def get(self, key):
+        """
+        Return the cached angle for key, or None (counted as a miss).
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if self._conn is not None:
+            row = self._conn.execute('SELECT angle FROM zero_angles WHERE key = ?',
+                                     (repr(key),)).fetchone()
+            if row is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, row[0])
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def put(self, key, angle):
+        """
+        Store a solved angle in memory and, if enabled, on disk.
+        """
+        self._remember(key, angle)
+        if self._conn is not None:
+            self._conn.execute('INSERT OR REPLACE INTO zero_angles (key, angle) VALUES (?, ?)',
+                               (repr(key), angle))
+            self._conn.commit()
+
+    def _remember(self, key, angle):
+        """
+        Insert into the in-memory LRU, evicting the oldest entries past maxsize.
+        """
+        self._entries[key] = angle
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def info(self):
+        """
+        Hit/miss counters and current size.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'size': len(self._entries),
+            'maxsize': self.maxsize
+        }
+
+    def clear(self):
+        """
+        Empty the in-memory entries and reset the counters (the disk file is kept).
+        """
+        self._entries.clear()
+        self.hits = self.misses = self.disk_hits = 0
+
+    def close(self):
+        """
+        Close the disk cache, if any.
+        """
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# Shared cache used by calculate_trajectory
+zero_angle_cache = ZeroAngleCache()
+
+
+def _cached_zero(initial_velocity, ballistic_coef, zero_range, sight_height,
+                 drag_function, integrator, dt, rtol, atol, solver, cache):
+    """
+    solve_zero_angle, going through cache when one is given. A cache hit
+    reports zero iterations and no reusable path.
+    """
+    key = None
+    if cache is not None:
+        key = cache.make_key(initial_velocity, ballistic_coef, zero_range, sight_height,
+                             drag_function, integrator, dt, rtol, atol, solver)
+        angle = cache.get(key)
+        if angle is not None:
+            instrumentation.count("solver.zero_cache_hits")
+            return {'angle': angle, 'iterations': 0, 'steps': 0, 'path': None}
+
+    zero = solve_zero_angle(
         initial_velocity,
         ballistic_coef,
         zero_range,
         sight_height,
-        drag_function
+        drag_function,
+        integrator,
+        dt,
+        rtol,
+        atol,
+        solver
     )
-    
-    # Constants
-    GRAVITY = 32.174
-    AIR_DENSITY = 0.0023769
-    
+    if cache is not None:
+        cache.put(key, zero['angle'])
+    return zero
+
+
+@instrumentation.timed("solver.calculate_trajectory")
+def calculate_trajectory(
+    initial_velocity,     # fps
+    ballistic_coef,       
+    zero_range,          # yards
+    target_range,        # yards
+    sight_height,        # inches
+    drag_function="G1",
+    integrator="euler",  # "euler", "rk4" or "rk45"
+    dt=TIME_STEP,        # seconds, initial step for "rk45"
+    rtol=1e-6,           # "rk45" only
+    atol=1e-6,           # "rk45" only
+    solver="bisection",  # "bisection", "secant" or "brent"
+    cache=zero_angle_cache,  # ZeroAngleCache, or None to always solve
+    sample_interval=None,  # yards, e.g. 25 for a point every 25 yards
+    sample_ranges=None,  # explicit list of ranges (yards) to record
+    as_array=False       # return the trajectory as a TRAJECTORY_DTYPE array
+):
+    """
+    Calculate bullet trajectory with proper zeroing.
+
+    The integrator is used both for zeroing and for the trajectory itself.
+    "euler" is the original fixed 1 ms step; "rk4" is a fixed-step
+    Runge-Kutta that stays accurate with much larger dt, and "rk45" picks its
+    own step size to meet rtol/atol. The result reports the number of steps
+    taken for the trajectory and the zero solver's iteration count.
+
+    When target_range <= zero_range the path simulated while zeroing already
+    covers the shot and is reused instead of integrating again.
+
+    The zero angle is looked up in cache first, so repeated queries for the
+    same rifle and load at different target ranges skip the zero solve
+    (zero_iterations is then 0).
+
+    By default every integration step is recorded. With sample_interval or
+    sample_ranges only the requested ranges up to target_range are kept,
+    interpolated between the surrounding steps (see _sample_at_range). The trajectory is a
+    list of (range_yards, drop_inches) tuples, or with as_array a structured
+    array that also carries velocity and time of flight.
+    """
+    # Find the initial angle needed for zeroing
+    zero = _cached_zero(initial_velocity, ballistic_coef, zero_range, sight_height,
+                        drag_function, integrator, dt, rtol, atol, solver, cache)
+    initial_angle = zero['angle']
+
     # Convert inputs to feet
     sight_height = sight_height / 12
     target_range = target_range * 3
-    
-    def calculate_drag_coefficient(velocity, drag_model="G1"):
-        mach = velocity / 1116.4
-        if drag_model == "G1":
-            if mach < 0.7:
-                return 0.2
-            elif mach < 1.2:
-                return 0.25 + (mach - 0.7) * 0.5
-            else:
-                return 0.52
-        else:  # G7
-            if mach < 0.7:
-                return 0.1
-            elif mach < 1.2:
-                return 0.15 + (mach - 0.7) * 0.3
-            else:
-                return 0.3
-    
+
+    acceleration = _acceleration_function(ballistic_coef, drag_function)
+
     # Initial conditions with proper angle
-    x = 0.0
-    y = sight_height
     vx = initial_velocity * math.cos(initial_angle)
     vy = initial_velocity * math.sin(initial_angle)
-    
-    dt = 0.001
-    positions = []
-    
-    while x <= target_range:
-        # Calculate relative height to line of sight
-        sight_line = sight_height  # straight line from sight to target
-        
-        v = math.sqrt(vx**2 + vy**2)
-        cd = calculate_drag_coefficient(v, drag_function)
-        drag = (AIR_DENSITY * v**2 * cd) / (ballistic_coef * 2)
-        
-        drag_x = drag * vx / v if v > 0 else 0
-        drag_y = drag * vy / v if v > 0 else 0
-        
-        vx = vx - (drag_x * dt)
-        vy = vy - (GRAVITY + drag_y) * dt
-        
+
+    # Calculate relative height to line of sight
+    sight_line = sight_height  # straight line from sight to target
+
+    path = None
+    if zero['path'] is not None and target_range <= zero_range * 3:
+        path = _truncate_path(zero['path'], target_range, integrator != "euler", inclusive=False)
+    if path is None:
+        path = _integrate(acceleration, 0.0, sight_height, vx, vy, target_range,
+                          integrator, dt, rtol, atol, inclusive=False, compiled=True)
+
+    requested = _requested_ranges(sample_interval, sample_ranges, target_range)
+    steps = 0
+    if requested is None:
+        samples = list(path)
+        steps = len(samples)
+        last = samples[-1]
+    else:
+        samples = []
+        last = (0.0, 0.0, sight_height, vx, vy)
+        i = 0
+        for sample in path:
+            steps += 1
+            while i < len(requested) and requested[i] <= sample[1]:
+                samples.append(_sample_at_range(last, sample, requested[i]))
+                i += 1
+            last = sample
+
+    instrumentation.count("solver.trajectory_steps", steps)
+    if as_array:
+        trajectory = _trajectory_array(samples, sight_line)
+    else:
+        # Store positions relative to sight line, in yards and inches
+        trajectory = [(x / 3, (y - sight_line) * 12) for _, x, y, _, _ in samples]
+
+    return {
+        'range_yards': target_range / 3,
+        'drop_inches': (last[2] - sight_line) * 12,
+        'trajectory': trajectory,
+        'steps': steps,
+        'zero_iterations': zero['iterations']
+    }
+
+
+def iter_trajectory(
+    initial_velocity,     # fps
+    ballistic_coef,
+    zero_range,          # yards
+    target_range=None,   # yards, None to run until a stop condition is hit
+    sight_height=1.5,    # inches
+    drag_function="G1",
+    integrator="euler",  # "euler", "rk4" or "rk45"
+    dt=TIME_STEP,        # seconds, initial step for "rk45"
+    rtol=1e-6,           # "rk45" only
+    atol=1e-6,           # "rk45" only
+    solver="bisection",  # "bisection", "secant" or "brent"
+    cache=zero_angle_cache,  # ZeroAngleCache, or None to always solve
+    sample_interval=None,  # yards, None yields every integration step
+    min_velocity=None,   # fps, stop once the bullet slows below this
+    max_drop=None        # inches, stop once the drop exceeds this
+):
+    """
+    Generator version of calculate_trajectory.
+
+    Yields a TrajectorySample as the integration goes, so callers such as a
+    live plot can consume the path without waiting for it to finish or
+    holding all of it. Integration stops after target_range, or after the
+    first sample that is slower than min_velocity or has dropped more than
+    max_drop below the line of sight; the caller can also simply stop
+    iterating. With sample_interval the samples are interpolated between
+    steps the same way as calculate_trajectory's.
+    """
+    zero = _cached_zero(initial_velocity, ballistic_coef, zero_range, sight_height,
+                        drag_function, integrator, dt, rtol, atol, solver, cache)
+
+    # Convert inputs to feet
+    sight_line = sight_height / 12
+    stop_range = math.inf if target_range is None else target_range * 3
+    interval = None if sample_interval is None else sample_interval * 3
+    if interval is not None and interval <= 0:
+        raise ValueError("sample_interval must be positive")
+
+    acceleration = _acceleration_function(ballistic_coef, drag_function)
+    vx = initial_velocity * math.cos(zero['angle'])
+    vy = initial_velocity * math.sin(zero['angle'])
+
+    last = (0.0, 0.0, sight_line, vx, vy)
+    next_range = 0.0
+    for sample in _integrate(acceleration, 0.0, sight_line, vx, vy, stop_range,
+                             integrator, dt, rtol, atol, inclusive=False):
+        if interval is None:
+            points = [sample]
+        else:
+            points = []
+            while next_range <= sample[1] and next_range <= stop_range:
+                points.append(_sample_at_range(last, sample, next_range))
+                next_range += interval
+        last = sample
+
+        for t, x, y, vx, vy in points:
+            velocity = math.sqrt(vx**2 + vy**2)
+            drop = (y - sight_line) * 12
+            yield TrajectorySample(x / 3, drop, velocity, t)
+
+            if min_velocity is not None and velocity < min_velocity:
+                return
+            if max_drop is not None and -drop > max_drop:
+                return
+
+
+def _requested_ranges(sample_interval, sample_ranges, target_range):
+    """
+    Sorted requested sample ranges in feet, up to target_range (feet), or
+    None to record every step.
+    """
+    if sample_interval is None and sample_ranges is None:
+        return None
+
+    ranges = []
+    if sample_interval is not None:
+        if sample_interval <= 0:
+            raise ValueError("sample_interval must be positive")
+        ranges.extend(np.arange(0, target_range / 3 + 1e-9, sample_interval).tolist())
+    if sample_ranges is not None:
+        ranges.extend(sample_ranges)
+    return sorted(set(r * 3 for r in ranges if 0 <= r * 3 <= target_range))
+
+
+def _sample_at_range(start, end, x):
+    """
+    Interpolate two raw (t, x, y, vx, vy) samples at range x (feet) the way
+    _interpolate_to_range does, so samples inside the long "rk45" steps are
+    as accurate as their endpoints.
+    """
+    return _interpolate_to_range(start[0], start[1:], end[0] - start[0], end[1:], x)
+
+
+def _trajectory_array(samples, sight_line):
+    """
+    Pack raw (t, x, y, vx, vy) samples into a TRAJECTORY_DTYPE array.
+    """
+    raw = np.array(samples, dtype=float).reshape(-1, 5)
+    trajectory = np.empty(len(raw), dtype=TRAJECTORY_DTYPE)
+    trajectory['range_yards'] = raw[:, 1] / 3
+    trajectory['drop_inches'] = (raw[:, 2] - sight_line) * 12
+    trajectory['velocity_fps'] = np.hypot(raw[:, 3], raw[:, 4])
+    trajectory['time_of_flight'] = raw[:, 0]
+    return trajectory
+
+
+def _integrate_batch(angle, initial_velocity, ballistic_coef, sight_height,
+                     stop_range, drag_function="G1", inclusive=True,
+                     density=None, speed_of_sound=None, wind_x=None, wind_z=None,
+                     interpolate=False):
+    """
+    Integrate every row of the 3D state array until it reaches its stop range.
+
+    All inputs are 1-D arrays of the same length (feet, radians, fps). The
+    optional density (slug/ft³), speed_of_sound (ft/s) and wind velocity
+    (ft/s, x downrange and z to the right) arrays default to standard air
+    with no wind. Drag acts against the velocity relative to the air.
+
+    A row is finished at the first step where x >= stop_range (inclusive) or
+    x > stop_range (not inclusive), matching simulate_to_zero and the main
+    loop of calculate_trajectory respectively. Finished rows are dropped from
+    the working arrays so later steps only touch the bullets still in flight.
+
+    Returns (y, z, vx, vy, vz, time) at the finishing step of each row, or
+    with interpolate at exactly the stop range, interpolated linearly
+    between the finishing step and the one before it.
+    """
+    n = angle.shape[0]
+    out_y = np.empty(n)
+    out_z = np.empty(n)
+    out_vx = np.empty(n)
+    out_vy = np.empty(n)
+    out_vz = np.empty(n)
+    out_t = np.empty(n)
+
+    def per_row(values, default):
+        return np.broadcast_to(default if values is None else values, (n,)).astype(float)
+
+    # Working state for rows still in flight
+    rows = np.arange(n)
+    x = np.zeros(n)
+    y = sight_height.copy()
+    z = np.zeros(n)
+    vx = initial_velocity * np.cos(angle)
+    vy = initial_velocity * np.sin(angle)
+    vz = np.zeros(n)
+    stop = stop_range
+    sound = per_row(speed_of_sound, SPEED_OF_SOUND)
+    wx = per_row(wind_x, 0.0)
+    wz = per_row(wind_z, 0.0)
+    t = 0.0
+    dt = TIME_STEP
+
+    drag_model = get_drag_model(drag_function)
+    k = per_row(density, AIR_DENSITY) * DRAG_FACTOR / ballistic_coef
+
+    while rows.size:
+        # Velocity relative to the air
+        ux = vx - wx
+        uz = vz - wz
+        v = np.sqrt(ux**2 + vy**2 + uz**2)
+        cd = drag_model(v / sound)
+        # drag * v_component / v, written without the division so v == 0 is safe
+        drag_over_v = k * v * cd
+
+        previous = (x, y, z, vx, vy, vz)
+
+        vx = vx - (drag_over_v * ux * dt)
+        vy = vy - (GRAVITY + drag_over_v * vy) * dt
+        vz = vz - (drag_over_v * uz * dt)
+
         x = x + vx * dt
         y = y + vy * dt
-        
-        # Store position relative to sight line
-        drop = y - sight_line
-        positions.append((x / 3, drop * 12))  # convert to yards and inches
-    
+        z = z + vz * dt
+        t += dt
+
+        done = x >= stop if inclusive else x > stop
+        if done.any():
+            finished = rows[done]
+            if interpolate:
+                x0 = previous[0][done]
+                f = (stop[done] - x0) / (x[done] - x0)  # fraction of the last step
+                for out, before, after in zip((out_y, out_z, out_vx, out_vy, out_vz), previous[1:],
+                                              (y, z, vx, vy, vz)):
+                    out[finished] = before[done] + f * (after[done] - before[done])
+                out_t[finished] = t - dt + f * dt
+            else:
+                out_y[finished] = y[done]
+                out_z[finished] = z[done]
+                out_vx[finished] = vx[done]
+                out_vy[finished] = vy[done]
+                out_vz[finished] = vz[done]
+                out_t[finished] = t
+
+            keep = ~done
+            rows = rows[keep]
+            x, y, z = x[keep], y[keep], z[keep]
+            vx, vy, vz = vx[keep], vy[keep], vz[keep]
+            k, stop, sound, wx, wz = k[keep], stop[keep], sound[keep], wx[keep], wz[keep]
+
+    instrumentation.count("solver.batch_rows", n)
+    instrumentation.count("solver.batch_steps", round(t / dt))
+    return out_y, out_z, out_vx, out_vy, out_vz, out_t
+
+
+@instrumentation.timed("solver.find_zero_angles_batch")
+def find_zero_angles_batch(
+    initial_velocity,     # fps
+    ballistic_coef,
+    zero_range,          # yards
+    sight_height,        # inches
+    drag_function="G1",
+    atmosphere=None      # Atmosphere, None for standard sea-level air
+):
+    """
+    Vectorized find_zero_angle. Arguments may be scalars or arrays and are
+    broadcast together; the bisection runs on every row at once and rows
+    that have converged are no longer simulated. Zeroing is done in still air.
+    """
+    density, sound = _atmosphere_values(atmosphere)
+    initial_velocity, ballistic_coef, zero_range, sight_height, density, sound = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in
+          (initial_velocity, ballistic_coef, zero_range, sight_height, density, sound)))
+    shape = initial_velocity.shape
+
+    v0 = initial_velocity.ravel()
+    bc = ballistic_coef.ravel()
+    sight = sight_height.ravel() / 12  # convert to feet
+    zero = zero_range.ravel() * 3      # convert to feet
+    density = density.ravel()
+    sound = sound.ravel()
+
+    angle_low = np.full(v0.shape, -0.1)   # radians
+    angle_high = np.full(v0.shape, 0.1)   # radians
+    result = np.full(v0.shape, np.nan)
+    active = np.arange(v0.size)
+
+    for _ in range(50):
+        if not active.size:
+            break
+        instrumentation.count("solver.batch_zero_iterations")
+        angle_mid = (angle_low[active] + angle_high[active]) / 2
+        height = _integrate_batch(angle_mid, v0[active], bc[active],
+                                  sight[active], zero[active],
+                                  drag_function, inclusive=True,
+                                  density=density[active],
+                                  speed_of_sound=sound[active])[0]
+        target_height = sight[active]
+
+        converged = np.abs(height - target_height) < 0.0001  # feet
+        result[active[converged]] = angle_mid[converged]
+
+        high = ~converged & (height > target_height)
+        low = ~converged & ~(height > target_height)
+        angle_high[active[high]] = angle_mid[high]
+        angle_low[active[low]] = angle_mid[low]
+
+        active = active[~converged]
+
+    result[active] = (angle_low[active] + angle_high[active]) / 2
+    return result.reshape(shape)
+
+
+@instrumentation.timed("solver.calculate_trajectories_batch")
+def calculate_trajectories_batch(
+    initial_velocity,     # fps
+    ballistic_coef,
+    zero_range,          # yards
+    target_range,        # yards
+    sight_height,        # inches
+    drag_function="G1",
+    crosswind=0.0,       # mph, positive blows from left to right
+    headwind=0.0,        # mph, positive blows toward the shooter
+    atmosphere=None,     # Atmosphere, None for standard sea-level air
+    stability_factor=None,  # gyroscopic stability Sg, None for no spin drift
+    twist="right",       # barrel twist direction for spin drift
+    launch_angle=None,   # radians, None to zero at zero_range
+    exact_range=False    # interpolate to exactly target_range
+):
+    """
+    Calculate the trajectories of many loads at once.
+
+    Each argument may be a scalar or an array; they are broadcast against each
+    other so e.g. a column of velocities and a row of BCs give a full grid.
+    All rows are integrated together in one NumPy state array with the same
+    Euler step as calculate_trajectory, and each row drops out of the
+    computation once it passes its target range. Only the end point of each
+    trajectory is kept, not the full path.
+
+    The model is a 3D point mass: wind changes the airspeed the drag is
+    computed from, and the atmosphere sets the air density and speed of
+    sound. The rifle is zeroed in still air in the same atmosphere, unless
+    launch_angle gives the bore angle above the sight line directly (zero_range
+    is then ignored). Spin drift is added with Litz's approximation
+    1.25 * (Sg + 1.2) * t^1.83 inches when a stability factor is given.
+
+    Like calculate_trajectory, the end point is the first step past the
+    target range; with exact_range it is interpolated to the target range
+    itself instead, which matters when one step is a large part of it.
+
+    Returns a dict of arrays with the broadcast shape of the inputs;
+    windage_inches is positive to the right and includes spin drift.
+    """
+    if twist not in ("right", "left"):
+        raise ValueError("twist must be 'right' or 'left'")
+
+    density, sound = _atmosphere_values(atmosphere)
+    spin = stability_factor is not None
+    zeroed = launch_angle is None
+    (initial_velocity, ballistic_coef, zero_range, target_range, sight_height,
+     crosswind, headwind, density, sound, stability_factor, launch_angle) = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in
+          (initial_velocity, ballistic_coef, zero_range, target_range, sight_height,
+           crosswind, headwind, density, sound, stability_factor if spin else 0.0,
+           0.0 if zeroed else launch_angle)))
+    shape = initial_velocity.shape
+
+    if zeroed:
+        zero_angle = find_zero_angles_batch(initial_velocity, ballistic_coef, zero_range,
+                                            sight_height, drag_function, (density, sound))
+    else:
+        zero_angle = launch_angle.copy()
+
+    sight = sight_height.ravel() / 12   # convert to feet
+    target = target_range.ravel() * 3   # convert to feet
+
+    y, z, vx, vy, vz, t = _integrate_batch(zero_angle.ravel(), initial_velocity.ravel(),
+                                           ballistic_coef.ravel(), sight, target,
+                                           drag_function, inclusive=False,
+                                           density=density.ravel(),
+                                           speed_of_sound=sound.ravel(),
+                                           wind_x=-headwind.ravel() * MPH_TO_FPS,
+                                           wind_z=crosswind.ravel() * MPH_TO_FPS,
+                                           interpolate=exact_range)
+
+    spin_drift = np.zeros_like(t)
+    if spin:
+        spin_drift = 1.25 * (stability_factor.ravel() + 1.2) * t**1.83
+        if twist == "left":
+            spin_drift = -spin_drift
+
+    drop = y - sight
     return {
-        'range_yards': target_range / 3,
-        'drop_inches': positions[-1][1],
-        'trajectory': positions
+        'range_yards': target_range.copy(),
+        'drop_inches': (drop * 12).reshape(shape),
+        'windage_inches': (z * 12 + spin_drift).reshape(shape),
+        'spin_drift_inches': spin_drift.reshape(shape),
+        'velocity_fps': np.sqrt(vx**2 + vy**2 + vz**2).reshape(shape),
+        'time_of_flight': t.reshape(shape),
+        'zero_angle': zero_angle,
     }
 
+
+def _atmosphere_values(atmosphere):
+    """
+    (density, speed of sound) for an Atmosphere, a (density, speed of sound)
+    pair, or None for the standard constants.
+    """
+    if atmosphere is None:
+        return AIR_DENSITY, SPEED_OF_SOUND
+    if isinstance(atmosphere, Atmosphere):
+        return atmosphere.density, atmosphere.speed_of_sound
+    return atmosphere
+
+
 def print_trajectory_example():
     params = {
         'initial_velocity': 2750,    # fps
@@ -169,7 +1040,8 @@ def print_trajectory_example():
         'zero_range': 100,           # 100 yard zero
         'target_range': 500,         # max range to calculate
         'sight_height': 1.5,         # 1.5 inch sight height
-        'drag_function': "G1"
+        'drag_function': "G1",
+        'sample_interval': 25        # one row every 25 yards
     }
     
     result = calculate_trajectory(**params)
@@ -0,0 +1,149 @@
+import numpy as np
+
+# Robust center estimators accepted by robust_center and group_statistics
+CENTER_METHODS = ("mean", "median", "trimmed")
+
+
+def _inside_extremes(points):
+    """
+    Mask of points strictly inside the polygon through the extreme points in
+    x, y, x + y and x - y (Akl-Toussaint). None of them can be on the hull,
+    so they are dropped before the Python-level hull scan.
+    """
+    keys = np.column_stack((points[:, 0], points[:, 1],
+                            points[:, 0] + points[:, 1], points[:, 0] - points[:, 1]))
+    extremes = points[np.unique(np.concatenate((keys.argmin(axis=0), keys.argmax(axis=0))))]
+    if len(extremes) < 3:
+        return np.zeros(len(points), dtype=bool)
+
+    # Order the polygon counter-clockwise around its centroid
+    middle = extremes.mean(axis=0)
+    extremes = extremes[np.argsort(np.arctan2(*(extremes - middle).T[::-1]))]
+
+    inside = np.ones(len(points), dtype=bool)
+    for a, b in zip(extremes, np.roll(extremes, -1, axis=0)):
+        inside &= ((b[0] - a[0]) * (points[:, 1] - a[1]) - (b[1] - a[1]) * (points[:, 0] - a[0])) > 0
+    return inside
+
+
+def convex_hull(points):
+    """
+    Convex hull of (N, 2) points by Andrew's monotone chain, as an (M, 2)
+    array in counter-clockwise order (y up).
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) > 64:
+        points = points[~_inside_extremes(points)]
+    points = np.unique(points, axis=0)
+    if len(points) < 3:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    # np.unique already sorted the points by x, then y
+    ordered = points.tolist()
+    lower, upper = [], []
+    for p in ordered:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(ordered):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def extreme_spread(points):
+    """
+    Largest center-to-center distance between any two shots. Only hull
+    vertices can be the farthest pair, so large groups stay cheap.
+    """
+    hull = convex_hull(points)
+    if len(hull) < 2:
+        return 0.0
+    diff = hull[:, None, :] - hull[None, :, :]
+    return float(np.sqrt((diff ** 2).sum(axis=-1)).max())
+
+
+def reject_fliers(points, k=3.0):
+    """
+    Boolean mask of the shots to keep. A shot is a flier when its distance
+    from the median center is more than k scaled MADs above the median
+    distance; at least half the group is always kept.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) < 4:
+        return np.ones(len(points), dtype=bool)
+
+    radii = np.hypot(*(points - np.median(points, axis=0)).T)
+    median = np.median(radii)
+    mad = 1.4826 * np.median(np.abs(radii - median))
+    if mad == 0:
+        return np.ones(len(points), dtype=bool)
+    return radii <= median + k * mad
+
+
+def robust_center(points, method="mean", trim=0.1, fliers=False):
+    """
+    Group center by the given method, optionally after flier rejection.
+
+    "trimmed" drops the trim fraction of shots at each end of each axis
+    before averaging. Returns (center, keep mask).
+    """
+    if method not in CENTER_METHODS:
+        raise ValueError(f"Unknown center method {method!r}, expected one of {CENTER_METHODS}")
+
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if not len(points):
+        raise ValueError("No shots marked!")
+
+    keep = reject_fliers(points) if fliers else np.ones(len(points), dtype=bool)
+    kept = points[keep]
+
+    if method == "mean":
+        center = kept.mean(axis=0)
+    elif method == "median":
+        center = np.median(kept, axis=0)
+    else:
+        cut = int(len(kept) * trim)
+        ordered = np.sort(kept, axis=0)
+        center = ordered[cut:len(kept) - cut].mean(axis=0)
+    return (float(center[0]), float(center[1])), keep
+
+
+def group_statistics(shots, scale=(1.0, 1.0), method="mean", fliers=False):
+    """
+    Size and shape statistics for a shot group.
+
+    shots are (x, y) pixel positions; scale is the (x, y) size of a pixel in
+    inches, so every distance comes back in inches. Rejected fliers are
+    excluded from everything except the count of rejected shots.
+
+    Returns a dict with count, rejected, center (pixels), extreme_spread,
+    mean_radius, cep (R50, the median distance from the center), sd_x, sd_y
+    and hull (pixel vertices).
+    """
+    points = np.asarray(shots, dtype=float).reshape(-1, 2)
+    center, keep = robust_center(points, method, fliers=fliers)
+    kept = points[keep]
+
+    # Work in inches from here on
+    scaled = kept * np.asarray(scale, dtype=float)
+    offsets = scaled - np.asarray(center) * np.asarray(scale, dtype=float)
+    radii = np.hypot(offsets[:, 0], offsets[:, 1])
+    ddof = 1 if len(kept) > 1 else 0
+
+    return {
+        'count': int(len(kept)),
+        'rejected': np.flatnonzero(~keep).tolist(),
+        'center': center,
+        'extreme_spread': extreme_spread(scaled),
+        'mean_radius': float(radii.mean()),
+        'cep': float(np.median(radii)),
+        'sd_x': float(scaled[:, 0].std(ddof=ddof)),
+        'sd_y': float(scaled[:, 1].std(ddof=ddof)),
+        'hull': convex_hull(kept).tolist(),
+    }
+
@@ -0,0 +1,360 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import instrumentation
+
+# Shared by the app and the command line tools
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), "scope_adjustment_data", "scope_adjustments.db")
+
+# Applied to every connection. WAL lets readers run alongside a writer and makes
+# commits an append to the log; NORMAL sync is safe with WAL and avoids an fsync
+# per transaction.
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -8000),  # KiB
+    ('busy_timeout', 5000),  # ms
+)
+
+# Group statistics columns of calibration_history, with their SQL types
+STATISTICS_COLUMNS = (
+    ('shot_count', 'INTEGER'),
+    ('extreme_spread', 'FLOAT'),
+    ('mean_radius', 'FLOAT'),
+    ('cep', 'FLOAT'),
+    ('sd_x', 'FLOAT'),
+    ('sd_y', 'FLOAT'),
+)
+
+# Insertable calibration_history columns, in order
+HISTORY_FIELDS = ('user_id', 'date', 'target_distance', 'horizontal_adjustment', 'vertical_adjustment',
+                  'adjustment_type', 'bullet_manufacturer', 'bullet_model', 'bullet_weight') \
+    + tuple(column for column, _ in STATISTICS_COLUMNS)
+
+
+def _create_tables(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE,
+            created_date TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS calibration_history (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            date TIMESTAMP,
+            target_distance FLOAT,
+            horizontal_adjustment FLOAT,
+            vertical_adjustment FLOAT,
+            adjustment_type TEXT,
+            bullet_manufacturer TEXT,
+            bullet_model TEXT,
+            bullet_weight INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+
+def _add_statistics_columns(conn):
+    # Databases written by earlier versions of the app may already have some of them
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(calibration_history)')}
+    for column, column_type in STATISTICS_COLUMNS:
+        if column not in existing:
+            conn.execute(f'ALTER TABLE calibration_history ADD COLUMN {column} {column_type}')
+
+
+def _add_indexes(conn):
+    # Newest-first listing, overall and per user
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_calibration_history_date ON calibration_history (date)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_calibration_history_user_date '
+                 'ON calibration_history (user_id, date)')
+
+
+def _epoch_dates(conn):
+    # Dates used to be stored as local-time strings from datetime.now(); store them
+    # as Unix time so they sort and compare as numbers and SQLite can format them
+    conn.execute('''
+        UPDATE calibration_history SET date = (julianday(date, 'utc') - 2440587.5) * 86400.0
+        WHERE typeof(date) = 'text'
+    ''')
+
+
+def _add_bullet_profiles(conn):
+    # Velocity and BC last used with each bullet, for the ballistic adjustment
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS bullet_profiles (
+            bullet_manufacturer TEXT NOT NULL,
+            bullet_model TEXT NOT NULL,
+            bullet_weight INTEGER NOT NULL,
+            velocity FLOAT,
+            ballistic_coef FLOAT,
+            drag_function TEXT,
+            PRIMARY KEY (bullet_manufacturer, bullet_model, bullet_weight)
+        )
+    ''')
+
+
+# Schema migrations, applied in order. Each one runs in its own transaction
+# together with the schema_version update (see HistoryStore.transaction), so
+# a failed upgrade leaves the database at the last good version. Only ever
+# append to this list.
+MIGRATIONS = (
+    _create_tables,
+    _add_statistics_columns,
+    _add_indexes,
+    _epoch_dates,
+    _add_bullet_profiles,
+)
+
+# Columns returned by HistoryStore.page, in order. date is Unix time and
+# date_text is the same instant as local time, formatted by SQLite.
+PAGE_COLUMNS = ('id', 'date', 'date_text', 'target_distance', 'horizontal_adjustment', 'vertical_adjustment',
+                'adjustment_type', 'bullet_manufacturer', 'bullet_model', 'bullet_weight',
+                'shot_count', 'extreme_spread', 'cep')
+
+
+def statistics_record(stats):
+    """
+    Map a group_stats.group_statistics result onto the statistics columns.
+    """
+    return {'shot_count': stats['count'], 'extreme_spread': stats['extreme_spread'],
+            'mean_radius': stats['mean_radius'], 'cep': stats['cep'],
+            'sd_x': stats['sd_x'], 'sd_y': stats['sd_y']}
+
+
+class HistoryStore:
+    """
+    Calibration history database: connection setup, schema migrations and
+    the queries the app and command line tools run against it.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        for name, value in PRAGMAS:
+            self.conn.execute(f'PRAGMA {name} = {value}')
+        self.migrate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block in one explicit transaction. Unlike "with conn:", this
+        covers DDL too: the sqlite3 module only opens a transaction itself
+        before INSERT/UPDATE/DELETE, so CREATE and ALTER statements would
+        otherwise each commit on their own.
+        """
+        self.conn.execute('BEGIN')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    @property
+    def schema_version(self):
+        row = self.conn.execute('SELECT version FROM schema_version').fetchone()
+        return row[0] if row else 0
+
+    @instrumentation.timed("db.migrate")
+    def migrate(self):
+        """Bring the schema up to date; returns the number of migrations applied."""
+        with self.transaction():
+            self.conn.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+            if self.conn.execute('SELECT COUNT(*) FROM schema_version').fetchone()[0] == 0:
+                self.conn.execute('INSERT INTO schema_version (version) VALUES (0)')
+
+        start = self.schema_version
+        for version, migration in enumerate(MIGRATIONS[start:], start + 1):
+            with self.transaction():
+                migration(self.conn)
+                self.conn.execute('UPDATE schema_version SET version = ?', (version,))
+        return len(MIGRATIONS) - start
+
+    @instrumentation.timed("db.add_calibrations")
+    def add_calibrations(self, records):
+        """
+        Insert calibration records (dicts keyed by HISTORY_FIELDS; missing
+        fields are NULL) in a single transaction. date is Unix time or a
+        datetime and defaults to now. Returns the number of rows written.
+        """
+        now = time.time()
+        rows = []
+        for record in records:
+            date = record.get('date', now)
+            if isinstance(date, datetime):
+                date = date.timestamp()
+            rows.append(tuple(date if field == 'date' else record.get(field) for field in HISTORY_FIELDS))
+        with self.conn:
+            self.conn.executemany(f'''
+                INSERT INTO calibration_history ({", ".join(HISTORY_FIELDS)})
+                VALUES ({", ".join("?" * len(HISTORY_FIELDS))})
+            ''', rows)
+        instrumentation.count("db.rows_written", len(rows))
+        return len(rows)
+
+    def add_calibration(self, **record):
+        """Insert one calibration record; see add_calibrations."""
+        self.add_calibrations([record])
+
+    @instrumentation.timed("db.page")
+    def page(self, limit=100, after=None, user_id=None, date_from=None, date_to=None,
+             distance=None, bullet=None):
+        """
+        One page of calibrations, newest first, as tuples of PAGE_COLUMNS.
+
+        Pass the (date, id) of the last row of the previous page as after to
+        get the next one. Seeking past it in the date index keeps every page
+        as cheap as the first, unlike OFFSET which reads and skips all the
+        earlier rows.
+
+        Filters: user_id, date_from <= date < date_to (Unix time), distance in
+        yards, and bullet, matched against the manufacturer or model name.
+        """
+        conditions, params = [], []
+        if after is not None:
+            conditions.append('(date, id) < (?, ?)')
+            params.extend(after)
+        if user_id is not None:
+            conditions.append('user_id = ?')
+            params.append(user_id)
+        if date_from is not None:
+            conditions.append('date >= ?')
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append('date < ?')
+            params.append(date_to)
+        if distance is not None:
+            conditions.append('target_distance = ?')
+            params.append(distance)
+        if bullet:
+            conditions.append("(bullet_manufacturer LIKE ? ESCAPE '\\' OR bullet_model LIKE ? ESCAPE '\\')")
+            pattern = '%' + bullet.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params.extend((pattern, pattern))
+
+        query = f'''
+            SELECT id, date, strftime('%Y-%m-%d %H:%M', date, 'unixepoch', 'localtime'),
+                    target_distance, horizontal_adjustment, vertical_adjustment, adjustment_type,
+                    bullet_manufacturer, bullet_model, bullet_weight, shot_count, extreme_spread, cep
+            FROM calibration_history
+            {"WHERE " + " AND ".join(conditions) if conditions else ""}
+            ORDER BY date DESC, id DESC
+            LIMIT ?
+        '''
+        params.append(limit)
+        return self.conn.execute(query, params).fetchall()
+
+    def bullet_profile(self, bullet_manufacturer, bullet_model, bullet_weight):
+        """
+        The saved (velocity, ballistic_coef, drag_function) of a bullet, or None.
+        Manufacturer and model match case-insensitively.
+        """
+        return self.conn.execute('''
+            SELECT velocity, ballistic_coef, drag_function FROM bullet_profiles
+            WHERE bullet_manufacturer = ? AND bullet_model = ? AND bullet_weight = ?
+        ''', (bullet_manufacturer.strip().lower(), bullet_model.strip().lower(), bullet_weight)).fetchone()
+
+    def save_bullet_profile(self, bullet_manufacturer, bullet_model, bullet_weight,
+                            velocity, ballistic_coef, drag_function="G1"):
+        """Remember the velocity and BC of a bullet, replacing any saved before."""
+        with self.conn:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO bullet_profiles
+                (bullet_manufacturer, bullet_model, bullet_weight, velocity, ballistic_coef, drag_function)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (bullet_manufacturer.strip().lower(), bullet_model.strip().lower(), bullet_weight,
+                  velocity, ballistic_coef, drag_function))
+
+    def clear(self):
+        """Delete all calibration history."""
+        with self.conn:
+            self.conn.execute('DELETE FROM calibration_history')
+
+    def close(self):
+        self.conn.close()
+
+
+class HistoryWorker:
+    """
+    Runs HistoryStore calls on a background thread with its own connection,
+    so a GUI thread never waits on the disk.
+
+    Requests are queued with submit and run in order. Their callbacks are
+    collected and only run when dispatch is called, on the caller's thread
+    (the app calls it from a Tk after() loop while requests are pending).
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0  # submitted but not yet dispatched; only touched by the submitting thread
+        self.thread = threading.Thread(target=self._run, args=(path,), name='history-db', daemon=True)
+        self.thread.start()
+
+    def _run(self, path):
+        try:
+            store, open_error = HistoryStore(path), None
+        except Exception as e:
+            store, open_error = None, e
+        try:
+            while True:
+                request = self.requests.get()
+                if request is None:
+                    break
+                method, args, kwargs, callback, errback = request
+                result, error = None, open_error
+                if store is not None:
+                    # Any failure, including a bad method name or arguments, goes to the
+                    # errback: if the thread died, every later request would be lost
+                    try:
+                        result = getattr(store, method)(*args, **kwargs)
+                    except Exception as e:
+                        error = e
+                self.results.put((callback, errback, result, error))
+        finally:
+            if store is not None:
+                store.close()
+
+    def submit(self, method, *args, callback=None, errback=None, **kwargs):
+        """
+        Queue a call of HistoryStore.method. On dispatch callback(result) is
+        run, or errback(error) if it raised.
+        """
+        self.pending += 1
+        self.requests.put((method, args, kwargs, callback, errback))
+
+    def dispatch(self):
+        """Run the callbacks of finished requests; returns how many are still pending."""
+        while True:
+            try:
+                callback, errback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return self.pending
+            self.pending -= 1
+            if error is not None:
+                if errback is not None:
+                    errback(error)
+            elif callback is not None:
+                callback(result)
+
+    def close(self, timeout=None):
+        """Finish the queued requests, then close the connection and stop the thread."""
+        self.requests.put(None)
+        self.thread.join(timeout)
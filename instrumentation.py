@@ -0,0 +1,114 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+# Off unless SCOPE_ADJUSTMENT_PROFILE is set (to anything but "0"). If it
+# names a .json file the measurements are written there when the program
+# exits. When disabled, every hook costs one global lookup and a branch.
+_setting = os.environ.get('SCOPE_ADJUSTMENT_PROFILE', '')
+enabled = _setting not in ('', '0')
+
+_lock = threading.Lock()  # the app records from its database thread too
+_timers = {}    # name -> [calls, total seconds, longest seconds]
+_counters = {}  # name -> total
+
+
+def enable(on=True):
+    """Turn recording on or off at runtime."""
+    global enabled
+    enabled = on
+
+
+def reset():
+    """Forget everything recorded so far."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def record(name, seconds):
+    """Add one timed call of seconds to timer name."""
+    with _lock:
+        entry = _timers.get(name)
+        if entry is None:
+            _timers[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+
+def count(name, amount=1):
+    """Add amount to counter name, when enabled."""
+    if enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+class timer:
+    """
+    Context manager timing its block under name, when enabled:
+
+        with instrumentation.timer("canvas.redraw"):
+            ...
+    """
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter() if enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            record(self.name, time.perf_counter() - self.start)
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function under name, when enabled.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def snapshot():
+    """
+    Everything recorded so far: per timer the call count, total and mean
+    and longest call in milliseconds, and the counter totals. Work done in
+    worker processes (range cards, Monte Carlo) is not included.
+    """
+    with _lock:
+        timers = {name: {'calls': calls,
+                         'total_ms': total * 1000,
+                         'mean_ms': total / calls * 1000,
+                         'max_ms': longest * 1000}
+                  for name, (calls, total, longest) in sorted(_timers.items())}
+        counters = dict(sorted(_counters.items()))
+    return {'enabled': enabled, 'timers': timers, 'counters': counters}
+
+
+def dump(path):
+    """Write snapshot() to path as JSON."""
+    with open(path, 'w') as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+if enabled and _setting.lower().endswith('.json'):
+    atexit.register(dump, _setting)
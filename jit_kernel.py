@@ -0,0 +1,189 @@
+import argparse
+import importlib.util
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+# Numba is optional: without it bullet_drop_test uses its pure-Python loop.
+# It is only imported when the kernel is first needed, since importing it
+# takes longer than most trajectories.
+AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# Whether the compiled kernel is used. Set SCOPE_ADJUSTMENT_JIT=0 to turn it
+# off even when Numba is installed.
+enabled = AVAILABLE and os.environ.get('SCOPE_ADJUSTMENT_JIT', '1') != '0'
+
+_compiled = None
+
+
+def _euler_path(mach, cd, slopes, k, gravity, speed_of_sound, x, y, vx, vy, stop_range, dt, inclusive):
+    """
+    The Euler loop of bullet_drop_test._integrate, step for step: the same
+    semi-implicit update and the same piecewise-linear drag table lookup,
+    with the operations in the same order so the results match the Python
+    loop. Returns the (steps, 5) array of (t, x, y, vx, vy) samples.
+    """
+    size = 1024
+    path = np.empty((size, 5))
+    n = 0
+    t = 0.0
+    last = len(slopes)
+    while True:
+        v = math.sqrt(vx**2 + vy**2)
+
+        # DragModel.__call__ for a scalar Mach number
+        m = v / speed_of_sound
+        i = np.searchsorted(mach, m, side='right') - 1
+        if i < 0:
+            drag = cd[0]
+        elif i >= last:
+            drag = cd[-1]
+        else:
+            drag = cd[i] + slopes[i] * (m - mach[i])
+
+        drag_over_v = k * v * drag
+        ax = -drag_over_v * vx
+        ay = -(gravity + drag_over_v * vy)
+        vx = vx + ax * dt
+        vy = vy + ay * dt
+        x = x + vx * dt
+        y = y + vy * dt
+        t += dt
+
+        if n == size:
+            grown = np.empty((size * 2, 5))
+            grown[:size] = path
+            path = grown
+            size *= 2
+        path[n, 0] = t
+        path[n, 1] = x
+        path[n, 2] = y
+        path[n, 3] = vx
+        path[n, 4] = vy
+        n += 1
+
+        if (x >= stop_range) if inclusive else (x > stop_range):
+            return path[:n]
+
+
+def _kernel():
+    """
+    The compiled _euler_path, compiled on first use. cache=True keeps the
+    machine code in __pycache__, so only the first run after installing or
+    editing this file pays for compilation.
+    """
+    global _compiled
+    if _compiled is None:
+        import numba
+        _compiled = numba.njit(cache=True)(_euler_path)
+    return _compiled
+
+
+def _drag_arrays(drag_model):
+    """
+    A DragModel's table as the float64 arrays the kernel takes, with the
+    per-segment slopes computed exactly as DragModel does.
+    """
+    return drag_model.mach, drag_model.cd, np.diff(drag_model.cd) / np.diff(drag_model.mach)
+
+
+def euler_path(drag_model, k, x, y, vx, vy, stop_range, dt, inclusive=True):
+    """
+    Run the compiled Euler kernel for acceleration with the given drag model
+    and drag constant k (see bullet_drop_test._acceleration_function).
+    Returns the (steps, 5) array of (t, x, y, vx, vy) samples.
+    """
+    from bullet_drop_test import GRAVITY, SPEED_OF_SOUND
+
+    mach, cd, slopes = _drag_arrays(drag_model)
+    return _kernel()(mach, cd, slopes, float(k), GRAVITY, SPEED_OF_SOUND,
+                     float(x), float(y), float(vx), float(vy), float(stop_range), float(dt), bool(inclusive))
+
+
+def warm_up():
+    """
+    Compile the kernel (or load it from the on-disk cache) now rather than
+    on the first trajectory. Returns the seconds it took, or None without Numba.
+    """
+    if not AVAILABLE:
+        return None
+    from drag_models import get_drag_model
+
+    start = time.perf_counter()
+    euler_path(get_drag_model("G1"), 1e-4, 0.0, 0.0, 2700.0, 0.0, 3.0, 0.001)
+    return time.perf_counter() - start
+
+
+# Loads compared by check_parity: (velocity, BC, zero range, target range, sight height, drag model)
+PARITY_LOADS = (
+    (2750, 0.485, 100, 1000, 1.5, "G1"),
+    (2600, 0.243, 200, 600, 1.75, "G7"),
+    (3200, 0.300, 100, 300, 2.0, "G1"),
+    (1100, 0.150, 50, 200, 1.5, "G1"),
+    (2900, 0.650, 300, 1500, 1.5, "G1"),
+)
+
+
+def check_parity(loads=PARITY_LOADS, tolerance=1e-9, compiled=True):
+    """
+    Run calculate_trajectory for each load with the kernel and with the
+    Python loop and compare every trajectory point, the step count and the
+    zero solver's iterations. Returns a list of (load, largest difference,
+    passed) tuples; differences are in inches or counts.
+
+    With compiled false the kernel's source runs as plain Python, which
+    checks the kernel's arithmetic without Numba installed.
+    """
+    if compiled and not AVAILABLE:
+        raise RuntimeError("Numba is not installed, so there is no compiled kernel to check")
+    import bullet_drop_test
+
+    global enabled, _compiled
+    previous = enabled, _compiled
+    if not compiled:
+        _compiled = _euler_path
+    results = []
+    try:
+        for load in loads:
+            runs = []
+            for use_jit in (False, True):
+                enabled = use_jit
+                runs.append(bullet_drop_test.calculate_trajectory(*load, cache=None))
+            python, jit = runs
+            if len(python['trajectory']) != len(jit['trajectory']):
+                difference = math.inf
+            else:
+                difference = max(
+                    max(abs(a[1] - b[1]) for a, b in zip(python['trajectory'], jit['trajectory'])),
+                    abs(python['steps'] - jit['steps']),
+                    abs(python['zero_iterations'] - jit['zero_iterations']),
+                )
+            results.append((load, difference, difference <= tolerance))
+    finally:
+        enabled, _compiled = previous
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Warm up and check the optional compiled trajectory kernel")
+    parser.add_argument('--tolerance', type=float, default=1e-9, help="largest allowed difference (default: 1e-9)")
+    args = parser.parse_args(argv)
+
+    if not AVAILABLE:
+        print("Numba is not installed; bullet_drop_test uses the pure-Python integration loop")
+        return
+    print(f"Kernel ready in {warm_up():.2f} s")
+
+    failed = False
+    for load, difference, passed in check_parity(tolerance=args.tolerance):
+        print(f"{'ok  ' if passed else 'FAIL'} {load}: largest difference {difference:.3g}")
+        failed = failed or not passed
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bullet_drop_test import calculate_trajectories_batch
+from drag_models import drag_models, get_drag_model
+
+# Radians in one minute of angle
+MOA = math.pi / (180 * 60)
+
+
+def _simulate_chunk(seed, draws, initial_velocity, ballistic_coef, target_range, sight_height,
+                    drag_function, zero_angle, velocity_sd, bc_sd, crosswind, wind_sd, dispersion_moa):
+    """
+    Worker entry point: impact points of one chunk of draws.
+
+    seed is a SeedSequence, so every chunk has its own independent stream
+    and the results do not depend on how chunks are spread over workers.
+    Returns (horizontal, vertical) arrays in inches relative to the line of
+    sight, positive right and up.
+    """
+    rng = np.random.default_rng(seed)
+    velocity = initial_velocity + velocity_sd * rng.standard_normal(draws)
+    bc = np.maximum(ballistic_coef + bc_sd * rng.standard_normal(draws), 1e-3)
+    wind = crosswind + wind_sd * rng.standard_normal(draws)
+    aim = dispersion_moa * MOA * rng.standard_normal((2, draws))
+
+    # Elevation error changes the launch angle; azimuth error swings the
+    # whole trajectory sideways by the range times the angle
+    result = calculate_trajectories_batch(velocity, bc, None, target_range, sight_height, drag_function,
+                                          crosswind=wind, launch_angle=zero_angle + aim[1], exact_range=True)
+    horizontal = result['windage_inches'] + aim[0] * target_range * 36
+    return horizontal, result['drop_inches']
+
+
+def simulate_hits(
+    initial_velocity,     # fps
+    ballistic_coef,
+    zero_range,          # yards
+    target_range,        # yards
+    target_width,        # inches
+    target_height,       # inches
+    sight_height=1.5,    # inches
+    drag_function="G1",
+    velocity_sd=0.0,     # fps, shot to shot muzzle velocity SD
+    bc_sd=0.0,           # ballistic coefficient SD
+    crosswind=0.0,       # mph, positive blows from left to right
+    wind_sd=0.0,         # mph, uncertainty of the crosswind
+    dispersion_moa=0.0,  # shooter and rifle angular SD per axis, MOA
+    hold=True,           # aim off for the nominal drop and drift
+    draws=100_000,
+    seed=None,
+    chunk_size=50_000,
+    workers=None
+):
+    """
+    Estimate the probability of hitting a target_width x target_height inch
+    rectangle at target_range with Monte Carlo draws of the load.
+
+    Each draw samples muzzle velocity, BC, crosswind and the shooter's
+    angular error from normal distributions around the given values and
+    flies the bullet with the batch trajectory solver from the rifle's
+    nominal zero. With hold the shooter aims off for the nominal load's
+    drop and drift at target_range, otherwise they hold dead on.
+
+    Draws are split into chunks of chunk_size, each integrated as one NumPy
+    batch with its own RNG stream spawned from seed, and the chunks are run
+    across a process pool (in-process when workers is 1). The same seed
+    gives the same answer for any number of workers.
+
+    Returns a dict with the hit probability and its standard error, the
+    hit count, and the mean and SD of the impacts relative to the aim point.
+    """
+    if draws <= 0:
+        raise ValueError("draws must be positive")
+    get_drag_model(drag_function)  # fail early on an unknown model
+
+    nominal = calculate_trajectories_batch(initial_velocity, ballistic_coef, zero_range, target_range,
+                                           sight_height, drag_function, crosswind=crosswind, exact_range=True)
+    zero_angle = float(nominal['zero_angle'])
+    aim_x, aim_y = 0.0, 0.0
+    if hold:
+        aim_x, aim_y = float(nominal['windage_inches']), float(nominal['drop_inches'])
+
+    sizes = [min(chunk_size, draws - start) for start in range(0, draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = (initial_velocity, ballistic_coef, target_range, sight_height, drag_function, zero_angle,
+            velocity_sd, bc_sd, crosswind, wind_sd, dispersion_moa)
+
+    if workers == 1:
+        chunks = [_simulate_chunk(chunk_seed, size, *args) for chunk_seed, size in zip(seeds, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_simulate_chunk, chunk_seed, size, *args)
+                       for chunk_seed, size in zip(seeds, sizes)]
+            chunks = [future.result() for future in futures]
+
+    horizontal = np.concatenate([h for h, _ in chunks]) - aim_x
+    vertical = np.concatenate([v for _, v in chunks]) - aim_y
+    hits = int(np.count_nonzero((np.abs(horizontal) <= target_width / 2) &
+                                (np.abs(vertical) <= target_height / 2)))
+    probability = hits / draws
+
+    return {
+        'draws': draws,
+        'hits': hits,
+        'hit_probability': probability,
+        'standard_error': math.sqrt(probability * (1 - probability) / draws),
+        'aim_inches': (aim_x, aim_y),
+        'mean_inches': (float(horizontal.mean()), float(vertical.mean())),
+        'sd_inches': (float(horizontal.std()), float(vertical.std())),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estimate hit probability with Monte Carlo draws of a load")
+    parser.add_argument('--velocity', type=float, required=True, help="muzzle velocity in fps")
+    parser.add_argument('--bc', type=float, required=True, help="ballistic coefficient")
+    parser.add_argument('--zero-range', type=float, default=100, help="yards (default: 100)")
+    parser.add_argument('--range', type=float, required=True, help="target range in yards")
+    parser.add_argument('--width', type=float, required=True, help="target width in inches")
+    parser.add_argument('--height', type=float, required=True, help="target height in inches")
+    parser.add_argument('--sight-height', type=float, default=1.5, help="inches (default: 1.5)")
+    parser.add_argument('--drag-function', choices=drag_models(), default="G1")
+    parser.add_argument('--velocity-sd', type=float, default=0.0, help="fps")
+    parser.add_argument('--bc-sd', type=float, default=0.0)
+    parser.add_argument('--crosswind', type=float, default=0.0, help="mph, positive from the left")
+    parser.add_argument('--wind-sd', type=float, default=0.0, help="mph")
+    parser.add_argument('--dispersion', type=float, default=0.0, help="angular SD per axis in MOA")
+    parser.add_argument('--no-hold', action='store_true', help="hold dead on instead of aiming off for drop and drift")
+    parser.add_argument('-n', '--draws', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, help="seed for reproducible results")
+    parser.add_argument('--chunk-size', type=int, default=50_000, help="draws per work unit (default: 50000)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    try:
+        result = simulate_hits(args.velocity, args.bc, args.zero_range, args.range, args.width, args.height,
+                               args.sight_height, args.drag_function, args.velocity_sd, args.bc_sd,
+                               args.crosswind, args.wind_sd, args.dispersion, not args.no_hold,
+                               args.draws, args.seed, args.chunk_size, args.workers)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
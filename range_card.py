@@ -0,0 +1,173 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bullet_drop_test import calculate_trajectory
+
+# Columns written for every range card row
+CARD_FIELDS = ['load', 'name', 'range_yards', 'drop_inches', 'holdover_moa', 'holdover_mil',
+               'velocity_fps', 'energy_ftlb', 'time_of_flight']
+
+# Load fields and their defaults when missing from the input file
+LOAD_DEFAULTS = {
+    'name': '',
+    'zero_range': 100,       # yards
+    'sight_height': 1.5,     # inches
+    'drag_function': "G1",
+    'bullet_weight': 0,      # grains, 0 leaves energy blank
+}
+
+
+def read_loads(path):
+    """
+    Read load profiles from a CSV (one load per row) or JSON (list of objects) file.
+    Every load needs initial_velocity and ballistic_coef.
+    """
+    with open(path, newline='') as f:
+        if path.lower().endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+
+    loads = []
+    for i, row in enumerate(rows):
+        load = dict(LOAD_DEFAULTS)
+        load.update({k: v for k, v in row.items() if v not in (None, '')})
+        try:
+            for field in ('initial_velocity', 'ballistic_coef', 'zero_range',
+                          'sight_height', 'bullet_weight'):
+                load[field] = float(load[field])
+        except KeyError as e:
+            raise ValueError(f"Load {i + 1} is missing {e.args[0]}") from None
+        except ValueError:
+            raise ValueError(f"Load {i + 1} has a non-numeric {field}") from None
+        loads.append(load)
+    return loads
+
+
+def range_card(load, max_range, interval):
+    """
+    Drop, holdover, velocity and energy for one load every interval yards.
+    """
+    result = calculate_trajectory(
+        load['initial_velocity'],
+        load['ballistic_coef'],
+        load['zero_range'],
+        max_range,
+        load['sight_height'],
+        load['drag_function'],
+        sample_interval=interval,
+        as_array=True
+    )
+
+    rows = []
+    for point in result['trajectory']:
+        range_yards = float(point['range_yards'])
+        drop = float(point['drop_inches'])
+        velocity = float(point['velocity_fps'])
+
+        # Holdover is the correction back up to the line of sight
+        if range_yards > 0:
+            holdover_moa = -drop / (range_yards / 100 * 1.047)
+            holdover_mil = -drop / (range_yards / 100 * 3.6)
+        else:
+            holdover_moa = holdover_mil = 0.0
+        energy = load['bullet_weight'] * velocity**2 / 450400 if load['bullet_weight'] else None
+
+        rows.append({
+            'name': load['name'],
+            'range_yards': range_yards,
+            'drop_inches': drop,
+            'holdover_moa': holdover_moa,
+            'holdover_mil': holdover_mil,
+            'velocity_fps': velocity,
+            'energy_ftlb': energy,
+            'time_of_flight': float(point['time_of_flight']),
+        })
+    return rows
+
+
+def _card_chunk(chunk, max_range, interval):
+    """
+    Worker entry point: range cards for a list of (index, load) pairs.
+    """
+    cards = []
+    for index, load in chunk:
+        rows = range_card(load, max_range, interval)
+        for row in rows:
+            row['load'] = index
+        cards.append((index, rows))
+    return cards
+
+
+def generate_range_cards(loads, max_range=1000, interval=100, workers=None,
+                         chunk_size=8, ordered=True):
+    """
+    Compute range cards for every load across a process pool.
+
+    Loads are sent to the workers in chunks of chunk_size to keep the
+    per-task overhead low. With ordered the cards come back in input order,
+    otherwise in the order the chunks finish. Returns a list of
+    (load index, rows) pairs.
+    """
+    indexed = list(enumerate(loads))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+
+    cards = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_card_chunk, chunk, max_range, interval) for chunk in chunks]
+        for future in (futures if ordered else as_completed(futures)):
+            cards.extend(future.result())
+    return cards
+
+
+def write_cards(cards, output):
+    """
+    Write all range cards to one CSV or JSON file, or CSV to stdout when output is None.
+    """
+    rows = [row for _, card in cards for row in card]
+
+    if output is not None and output.lower().endswith('.json'):
+        with open(output, 'w') as f:
+            json.dump([{'load': index, 'card': card} for index, card in cards], f, indent=2)
+        return
+
+    f = open(output, 'w', newline='') if output is not None else sys.stdout
+    try:
+        writer = csv.DictWriter(f, fieldnames=CARD_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    finally:
+        if output is not None:
+            f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate range cards for a list of loads")
+    parser.add_argument('loads', help="CSV or JSON file of load profiles")
+    parser.add_argument('-o', '--output', help="CSV or JSON output file (default: CSV to stdout)")
+    parser.add_argument('--max-range', type=float, default=1000, help="yards (default: 1000)")
+    parser.add_argument('--interval', type=float, default=100, help="yards between rows (default: 100)")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                        help="number of worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=8, help="loads per work unit (default: 8)")
+    parser.add_argument('--ordered', action=argparse.BooleanOptionalAction, default=True,
+                        help="write cards in input order; --no-ordered writes them as they finish "
+                             "(default: ordered)")
+    args = parser.parse_args(argv)
+
+    try:
+        loads = read_loads(args.loads)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    cards = generate_range_cards(loads, args.max_range, args.interval, args.workers,
+                                 args.chunk_size, args.ordered)
+    write_cards(cards, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import numpy as np
+from PIL import Image
+
+import instrumentation
+
+# Brightness relative to the surrounding paper below which a pixel is ink
+INK_RATIO = 0.45
+
+# Mean relative brightness a faint hole is at least; gray printed text is darker
+FAINT_MIN_RATIO = 0.7
+
+
+def otsu_threshold(gray):
+    """
+    Otsu's threshold for an 8-bit grayscale array.
+    """
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(float)
+    levels = np.arange(256)
+
+    weight_low = np.cumsum(histogram)
+    weight_high = weight_low[-1] - weight_low
+    sum_low = np.cumsum(histogram * levels)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_low = sum_low / weight_low
+        mean_high = (sum_low[-1] - sum_low) / weight_high
+        between = weight_low * weight_high * (mean_low - mean_high) ** 2
+    return int(np.nanargmax(between))
+
+
+def _window_sums(values, size, axis, dtype):
+    """
+    Sum of values in a centred window of size pixels along axis, from a
+    cumulative sum so the cost does not grow with size.
+    """
+    before = size // 2
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (before + 1, size - before - 1)
+    sums = np.cumsum(np.pad(values, pad), axis=axis, dtype=dtype)
+    n = values.shape[axis]
+    high = [slice(None), slice(None)]
+    low = [slice(None), slice(None)]
+    high[axis] = slice(size, size + n)
+    low[axis] = slice(0, n)
+    return sums[tuple(high)] - sums[tuple(low)]
+
+
+def _window_counts(mask, size, axis):
+    """
+    Number of True pixels in a centred window of size pixels along axis.
+    """
+    return _window_sums(mask, size, axis, np.int32)
+
+
+def _box_sum(values, size):
+    """
+    Sum of values over a centred size x size window, as two 1-D passes.
+    """
+    return _window_sums(_window_sums(values, size, 1, float), size, 0, float)
+
+
+def _erode(mask, size):
+    """
+    Binary erosion with a size x size square, done as two 1-D passes.
+    """
+    mask = _window_counts(mask, size, 1) == size
+    return _window_counts(mask, size, 0) == size
+
+
+def _dilate(mask, size):
+    """
+    Binary dilation with a size x size square, done as two 1-D passes.
+    """
+    mask = _window_counts(mask, size, 1) > 0
+    return _window_counts(mask, size, 0) > 0
+
+
+def _runs(mask):
+    """
+    Horizontal runs of True pixels as (row, start, end) arrays, end exclusive,
+    in row-major order.
+    """
+    height = mask.shape[0]
+    padded = np.zeros((height, mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends
+
+
+def label_components(mask):
+    """
+    8-connected components of a boolean mask, computed on horizontal runs.
+
+    Returns (rows, starts, ends, labels): the runs and the component label
+    (0..n-1) of each run. Working on runs rather than pixels keeps the
+    Python-level work proportional to the number of runs.
+    """
+    rows, starts, ends = _runs(mask)
+    parent = list(range(len(rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Index range of the runs on each row
+    row_bounds = np.searchsorted(rows, np.arange(mask.shape[0] + 1))
+    starts_list, ends_list = starts.tolist(), ends.tolist()
+
+    for row in range(1, mask.shape[0]):
+        prev_i, prev_end = row_bounds[row - 1], row_bounds[row]
+        cur_i, cur_end = row_bounds[row], row_bounds[row + 1]
+        # Two runs touch (including diagonally) when each starts before the other ends + 1
+        while prev_i < prev_end and cur_i < cur_end:
+            if starts_list[prev_i] <= ends_list[cur_i] and starts_list[cur_i] <= ends_list[prev_i]:
+                a, b = find(prev_i), find(cur_i)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+            if ends_list[prev_i] < ends_list[cur_i]:
+                prev_i += 1
+            else:
+                cur_i += 1
+
+    roots = np.array([find(i) for i in range(len(parent))], dtype=np.intp)
+    _, labels = np.unique(roots, return_inverse=True)
+    return rows, starts, ends, labels
+
+
+def _faint_mask(pixels, paper, chroma, min_contrast, max_chroma):
+    """
+    Pixels of holes that show up as light gray torn paper rather than dark
+    blobs, as on a white target square photographed from the front.
+
+    Each pixel is compared with the mean of the paper around it, so shadows
+    and uneven lighting do not matter. Pixels at least min_contrast darker
+    than their background count, except ink (printed lines and squares,
+    pen circles) and a halo around it, and colored marks such as a red pen
+    circle. A closing then joins the fragments of each torn hole.
+
+    Returns the mask and every pixel's brightness relative to its background.
+    """
+    size = min(pixels.shape)
+    window = int(size * 0.03) | 1
+    background = _box_sum(pixels * paper, window) / np.maximum(_box_sum(paper, window), 1)
+    ratio = pixels / np.maximum(background, 1)
+
+    halo = max(3, int(size * 0.002) | 1)
+    marks = (ratio < INK_RATIO) | (chroma > max_chroma)
+    mask = (ratio < 1 - min_contrast) & ~_dilate(marks, halo)
+
+    close = max(3, int(size * 0.006) | 1)
+    mask = _erode(_dilate(mask, close), close)
+    return _dilate(_erode(mask, 3), 3), ratio
+
+
+@instrumentation.timed("detection.detect_shots")
+def detect_shots(image, threshold=None, dark_holes=True, min_area=None, max_area=None,
+                 open_size=None, min_fill=0.4, max_aspect=2.5, faint_holes=True,
+                 min_contrast=0.1, min_texture=0.08, max_chroma=60):
+    """
+    Find bullet-hole centroids in a target image.
+
+    image is a PIL image or a path and should be the full-resolution scan.
+    The pipeline is: grayscale, threshold (Otsu when threshold is None),
+    a morphological opening of open_size pixels to cut holes loose from
+    thin printed rings and numbers, connected components, and a blob filter
+    on area, fill ratio (area / bounding box) and bounding-box aspect ratio.
+    Blobs touching the image edge are dropped.
+    Areas default to a fraction of the image so the same settings work at
+    any resolution.
+
+    With faint_holes (and dark_holes) light holes on white paper are found
+    too, by local contrast (see _faint_mask). As gray printing and shadows
+    also differ from the paper, these blobs must be textured like torn
+    paper: their brightness varies by at least min_texture, and on average
+    they are no darker than FAINT_MIN_RATIO and at least min_contrast
+    darker than the paper. max_chroma leaves out colored pen marks, so pass
+    a color image when there are any.
+
+    Returns a list of (x, y) centroids in image pixels, sorted top to bottom.
+    """
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+
+    gray = image.convert('L')
+    width, height = gray.size
+    pixels = np.asarray(gray)
+
+    if threshold is None:
+        threshold = otsu_threshold(pixels)
+    mask = pixels < threshold if dark_holes else pixels > threshold
+    paper = ~mask if dark_holes else None
+
+    if open_size is None:
+        open_size = max(3, int(min(width, height) * 0.008) | 1)
+    if open_size > 1:
+        mask = _dilate(_erode(mask, open_size), open_size)
+
+    ratio = None
+    if faint_holes and dark_holes:
+        if image.mode in ('L', 'LA', '1', 'I', 'F'):
+            chroma = np.zeros(pixels.shape, dtype=np.uint8)
+        else:
+            red, green, blue = np.moveaxis(np.asarray(image.convert('RGB')), 2, 0)
+            chroma = np.maximum(np.maximum(red, green), blue) - np.minimum(np.minimum(red, green), blue)
+        faint, ratio = _faint_mask(pixels.astype(float), paper, chroma, min_contrast, max_chroma)
+        mask = mask | faint
+
+    if min_area is None:
+        min_area = width * height * 0.0002
+    if max_area is None:
+        max_area = width * height * 0.01
+
+    rows, starts, ends, labels = label_components(mask)
+    if not len(labels):
+        return []
+    count = labels.max() + 1
+
+    # Per-component area, centroid and bounding box from the runs
+    lengths = (ends - starts).astype(float)
+    area = np.bincount(labels, lengths, minlength=count)
+    sum_x = np.bincount(labels, lengths * (starts + ends - 1) / 2, minlength=count)
+    sum_y = np.bincount(labels, lengths * rows, minlength=count)
+
+    left = np.full(count, width)
+    right = np.zeros(count)
+    top = np.full(count, height)
+    bottom = np.zeros(count)
+    np.minimum.at(left, labels, starts)
+    np.maximum.at(right, labels, ends)
+    np.minimum.at(top, labels, rows)
+    np.maximum.at(bottom, labels, rows + 1)
+    box_w = right - left
+    box_h = bottom - top
+
+    # Blobs cut off by the image edge are background or tape, not holes
+    inside = (left > 0) & (top > 0) & (right < width) & (bottom < height)
+
+    shape = ((area / (box_w * box_h) >= min_fill)
+             & (np.maximum(box_w, box_h) / np.minimum(box_w, box_h) <= max_aspect))
+    size = (area >= min_area) & (area <= max_area)
+
+    if ratio is not None:
+        # Mean and spread of each blob's relative brightness, from per-row prefix sums
+        prefix = np.zeros((height, width + 1))
+        np.cumsum(ratio, axis=1, out=prefix[:, 1:])
+        mean = np.bincount(labels, prefix[rows, ends] - prefix[rows, starts], minlength=count) / area
+        np.cumsum(ratio ** 2, axis=1, out=prefix[:, 1:])
+        spread = np.sqrt(np.maximum(
+            np.bincount(labels, prefix[rows, ends] - prefix[rows, starts], minlength=count) / area - mean ** 2, 0))
+
+        # Dark blobs are judged as before; faint ones may be smaller but must look torn
+        dark = mean < INK_RATIO
+        faint = ((area >= min_area / 2) & (area <= max_area)
+                 & (spread >= min_texture) & (mean >= FAINT_MIN_RATIO) & (mean <= 1 - min_contrast))
+        size = np.where(dark, size, faint)
+
+    keep = inside & size & shape
+
+    centroids = np.column_stack((sum_x / area, sum_y / area))[keep]
+    centroids = centroids[np.lexsort((centroids[:, 0], centroids[:, 1]))]
+    return [tuple(point) for point in centroids.tolist()]
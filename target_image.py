@@ -0,0 +1,129 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+from PIL import Image
+
+import instrumentation
+
+
+def file_hash(path, block_size=1 << 20):
+    """
+    SHA-1 of a file's contents, used to key cached thumbnails.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_preview(path, size):
+    """
+    Decode a preview that fits in size without distorting the aspect ratio.
+
+    JPEGs use draft mode so the decoder only does a reduced (1/2, 1/4 or 1/8)
+    decode instead of the full image. Returns (preview, original size).
+    """
+    image = Image.open(path)
+    original_size = image.size
+    image.draft('RGB', size)
+    image = image.convert('RGB')
+    image.thumbnail(size)
+    return image, original_size
+
+
+class ThumbnailCache:
+    """
+    Previews keyed by file hash and size, kept in a small in-memory LRU and
+    as PNG files in cache_dir so re-opening a target skips the decode.
+    """
+
+    def __init__(self, cache_dir, maxsize=16):
+        self.cache_dir = cache_dir
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def load(self, path, size):
+        """
+        Preview and original size for path, from the cache when possible.
+        """
+        key = (file_hash(path), tuple(size))
+        if key in self._entries:
+            instrumentation.count("image.preview_memory_hits")
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        digest, (width, height) = key
+        cached_path = os.path.join(self.cache_dir, f"{digest}_{width}x{height}.png")
+        entry = None
+        if os.path.exists(cached_path):
+            with Image.open(cached_path) as cached:
+                original = cached.info.get('original_size')
+                if original:
+                    instrumentation.count("image.preview_disk_hits")
+                    entry = (cached.convert('RGB'), tuple(int(v) for v in original.split('x')))
+
+        if entry is None:
+            instrumentation.count("image.preview_decodes")
+            with instrumentation.timer("image.decode_preview"):
+                entry = load_preview(path, size)
+            self._save(entry, cached_path)
+
+        self._entries[key] = entry
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def _save(self, entry, cached_path):
+        """
+        Write a preview to disk, recording the original size in a PNG text chunk.
+        """
+        from PIL import PngImagePlugin
+
+        preview, (width, height) = entry
+        info = PngImagePlugin.PngInfo()
+        info.add_text('original_size', f"{width}x{height}")
+        try:
+            preview.save(cached_path, pnginfo=info, compress_level=1)
+        except OSError:
+            pass  # the cache is only an optimization
+
+
+class CoordinateMapper:
+    """
+    Maps between original-image pixels and the display canvas.
+
+    The image is scaled to fit the display box with its aspect ratio kept and
+    centred, so shots can be stored at full resolution while the canvas only
+    shows a preview.
+    """
+
+    def __init__(self, original_size, display_size):
+        self.original_size = tuple(original_size)
+        self.display_size = tuple(display_size)
+
+        original_width, original_height = self.original_size
+        display_width, display_height = self.display_size
+        self.scale = min(display_width / original_width, display_height / original_height)
+        self.offset = ((display_width - original_width * self.scale) / 2,
+                       (display_height - original_height * self.scale) / 2)
+
+    def to_original(self, x, y):
+        """
+        Canvas position to original-image pixels.
+        """
+        return ((x - self.offset[0]) / self.scale, (y - self.offset[1]) / self.scale)
+
+    def to_display(self, x, y):
+        """
+        Original-image pixels to canvas position.
+        """
+        return (x * self.scale + self.offset[0], y * self.scale + self.offset[1])
+
+    def center(self):
+        """
+        Center of the original image, in original pixels.
+        """
+        return (self.original_size[0] / 2, self.original_size[1] / 2)
@@ -0,0 +1,44 @@
+import pytest
+
+import bullet_drop_test
+
+
+def test_rk45_samples_match_rk4_between_steps():
+    # rk45 steps are ~77 yd long here, so every sample but the last falls inside a step
+    kwargs = dict(sample_interval=100, cache=None, as_array=True)
+    rk4 = bullet_drop_test.calculate_trajectory(2750, 0.485, 100, 1000, 1.5, integrator='rk4', **kwargs)
+    rk45 = bullet_drop_test.calculate_trajectory(2750, 0.485, 100, 1000, 1.5, integrator='rk45', **kwargs)
+    assert list(rk45['trajectory']['range_yards']) == pytest.approx(list(rk4['trajectory']['range_yards']))
+    assert list(rk45['trajectory']['drop_inches']) == pytest.approx(list(rk4['trajectory']['drop_inches']), abs=0.01)
+    assert list(rk45['trajectory']['time_of_flight']) == pytest.approx(list(rk4['trajectory']['time_of_flight']), abs=1e-4)
+
+
+def test_iter_trajectory_rk45_samples_match_rk4():
+    def drops(integrator):
+        return [sample.drop_inches for sample in bullet_drop_test.iter_trajectory(
+            2750, 0.485, 100, 1000, 1.5, integrator=integrator, cache=None, sample_interval=100)]
+
+    assert drops('rk45') == pytest.approx(drops('rk4'), abs=0.01)
+
+
+@pytest.mark.parametrize('integrator', bullet_drop_test.INTEGRATORS)
+def test_zero_path_reuse_matches_fresh_trajectory(integrator):
+    # Solving the zero with no cache hands calculate_trajectory the zeroing path to reuse
+    reused = bullet_drop_test.calculate_trajectory(2750, 0.485, 200, 150, 1.5, integrator=integrator, cache=None)
+
+    # A cache hit has no path, so the trajectory is integrated from scratch
+    cache = bullet_drop_test.ZeroAngleCache()
+    bullet_drop_test.calculate_trajectory(2750, 0.485, 200, 150, 1.5, integrator=integrator, cache=cache)
+    fresh = bullet_drop_test.calculate_trajectory(2750, 0.485, 200, 150, 1.5, integrator=integrator, cache=cache)
+
+    assert fresh['zero_iterations'] == 0 < reused['zero_iterations']
+    assert reused['trajectory'] == fresh['trajectory']
+    assert reused['drop_inches'] == fresh['drop_inches']
+
+
+def test_truncate_path_uses_the_trajectory_stop_test():
+    path = [(0.001, 1.0, 0.0, 1.0, 0.0), (0.002, 2.0, 0.0, 1.0, 0.0)]
+    # A trajectory run to 2 ft only stops once it is past 2 ft, which this path never is
+    assert bullet_drop_test._truncate_path(path, 2.0, False) is None
+    assert bullet_drop_test._truncate_path(path, 1.5, False) == path
+    assert bullet_drop_test._truncate_path(path, 1.0, False) == path
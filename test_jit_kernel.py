@@ -0,0 +1,25 @@
+import pytest
+
+import bullet_drop_test
+import jit_kernel
+
+
+@pytest.mark.parametrize('load', jit_kernel.PARITY_LOADS)
+def test_kernel_source_matches_python_loop(load):
+    # The kernel's source run as plain Python, so this needs no Numba
+    [(_, difference, passed)] = jit_kernel.check_parity([load], compiled=False)
+    assert passed, f"largest difference {difference}"
+
+
+@pytest.mark.skipif(not jit_kernel.AVAILABLE, reason="Numba is not installed")
+@pytest.mark.parametrize('load', jit_kernel.PARITY_LOADS)
+def test_compiled_kernel_matches_python_loop(load):
+    [(_, difference, passed)] = jit_kernel.check_parity([load])
+    assert passed, f"largest difference {difference}"
+
+
+def test_iter_trajectory_without_range_stops_with_kernel_enabled(monkeypatch):
+    monkeypatch.setattr(jit_kernel, 'enabled', True)
+    monkeypatch.setattr(jit_kernel, '_compiled', jit_kernel._euler_path)
+    samples = list(bullet_drop_test.iter_trajectory(2750, 0.485, 100, None, 1.5, min_velocity=2000, cache=None))
+    assert samples[-1].velocity_fps < 2000 <= samples[-2].velocity_fps
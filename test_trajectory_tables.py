@@ -0,0 +1,22 @@
+import pytest
+
+import trajectory_tables
+
+
+@pytest.fixture(scope='module')
+def table():
+    return trajectory_tables.build_table([0, 100, 200], [2600, 2800], [0.4, 0.5], workers=1, check=False)
+
+
+@pytest.mark.parametrize('name, files', [
+    ('table', {'table.npy', 'table.json'}),
+    ('table.npy', {'table.npy', 'table.json'}),
+    ('table.dat', {'table.dat.npy', 'table.dat.json'}),
+])
+def test_save_and_load_use_the_same_file_pair(tmp_path, table, name, files):
+    path = str(tmp_path / name)
+    table.save(path)
+    assert {p.name for p in tmp_path.iterdir()} == files
+
+    loaded = trajectory_tables.TrajectoryTable.load(path)
+    assert loaded.lookup(150, 2700, 0.45) == table.lookup(150, 2700, 0.45)
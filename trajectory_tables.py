@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bullet_drop_test import TrajectorySample, calculate_trajectory
+from drag_models import drag_models, get_drag_model
+
+# Values stored at every grid point, in order along the last axis
+QUANTITIES = ('drop_inches', 'velocity_fps', 'time_of_flight')
+
+
+def _solve(ranges, velocity, ballistic_coef, zero_range, sight_height, drag_function, options):
+    """
+    Drop, velocity and time of flight at each of ranges (yards) for one load,
+    as a (len(ranges), 3) array.
+    """
+    result = calculate_trajectory(velocity, ballistic_coef, zero_range, max(ranges), sight_height,
+                                  drag_function, sample_ranges=list(ranges), as_array=True,
+                                  cache=None, **options)
+    trajectory = result['trajectory']
+    return np.column_stack([trajectory[name] for name in QUANTITIES])
+
+
+def _solve_chunk(loads, ranges, zero_range, sight_height, drag_function, options):
+    """
+    Worker entry point: _solve for a list of (velocity, ballistic_coef) pairs.
+    """
+    return [_solve(ranges, velocity, bc, zero_range, sight_height, drag_function, options)
+            for velocity, bc in loads]
+
+
+def _solve_all(loads, ranges, zero_range, sight_height, drag_function, options, workers, chunk_size):
+    chunks = [loads[i:i + chunk_size] for i in range(0, len(loads), chunk_size)]
+    args = (ranges, zero_range, sight_height, drag_function, options)
+    if workers == 1:
+        results = [_solve_chunk(chunk, *args) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_solve_chunk, chunks, *([a] * len(chunks) for a in args)))
+    return [column for chunk in results for column in chunk]
+
+
+def _table_paths(path):
+    """
+    The (.npy, .json) file pair of a table saved to path, with or without
+    the .npy np.save adds.
+    """
+    base = path[:-len('.npy')] if path.endswith('.npy') else path
+    return base + '.npy', base + '.json'
+
+
+def _locate(axis, value):
+    """
+    Cell index and fractional position of value on a sorted axis.
+    """
+    if not axis[0] <= value <= axis[-1]:
+        raise ValueError(f"{value} is outside the table ({axis[0]} to {axis[-1]})")
+    i = min(bisect_right(axis, value) - 1, len(axis) - 2)
+    return i, (value - axis[i]) / (axis[i + 1] - axis[i])
+
+
+def _locate_many(axis, values):
+    axis = np.asarray(axis)
+    if np.any((values < axis[0]) | (values > axis[-1])):
+        raise ValueError(f"Values outside the table ({axis[0]} to {axis[-1]})")
+    i = np.clip(np.searchsorted(axis, values, side='right') - 1, 0, len(axis) - 2)
+    return i, (values - axis[i]) / (axis[i + 1] - axis[i])
+
+
+class TrajectoryTable:
+    """
+    Drop, velocity and time of flight precomputed over a grid of range x
+    muzzle velocity x BC for one zero range, sight height and drag model,
+    answered by trilinear interpolation.
+
+    values is a (ranges, velocities, BCs, 3) float32 array, ordered as
+    QUANTITIES; a table loaded from disk keeps it memory-mapped so only the
+    cells a query touches are read. error_bounds holds the largest
+    interpolation error against the full solver found by check_errors.
+    """
+
+    def __init__(self, ranges, velocities, ballistic_coefs, values, zero_range, sight_height,
+                 drag_function="G1", options=None, error_bounds=None):
+        self.ranges = [float(r) for r in ranges]
+        self.velocities = [float(v) for v in velocities]
+        self.ballistic_coefs = [float(b) for b in ballistic_coefs]
+        self.values = np.asarray(values)  # a plain view of a memmap, which slices faster
+        self.zero_range = zero_range
+        self.sight_height = sight_height
+        self.drag_function = drag_function
+        self.options = dict(options or {})
+        self.error_bounds = error_bounds
+
+        for name, axis in (('ranges', self.ranges), ('velocities', self.velocities),
+                           ('ballistic_coefs', self.ballistic_coefs)):
+            if len(axis) < 2 or any(a >= b for a, b in zip(axis, axis[1:])):
+                raise ValueError(f"{name} must be at least two increasing values")
+        if values.shape != (len(self.ranges), len(self.velocities), len(self.ballistic_coefs), len(QUANTITIES)):
+            raise ValueError("values do not match the table axes")
+
+    def lookup(self, target_range, velocity, ballistic_coef):
+        """
+        Interpolated TrajectorySample at one range (yards) for one load.
+        """
+        i, fr = _locate(self.ranges, target_range)
+        j, fv = _locate(self.velocities, velocity)
+        k, fb = _locate(self.ballistic_coefs, ballistic_coef)
+
+        # Collapse the 2x2x2 cell one axis at a time
+        cell = self.values[i:i + 2, j:j + 2, k:k + 2]
+        cell = cell[0] + (cell[1] - cell[0]) * fr
+        cell = cell[0] + (cell[1] - cell[0]) * fv
+        drop, velocity_fps, time_of_flight = (cell[0] + (cell[1] - cell[0]) * fb).tolist()
+        return TrajectorySample(float(target_range), drop, velocity_fps, time_of_flight)
+
+    def lookup_many(self, target_range, velocity, ballistic_coef):
+        """
+        Vectorized lookup; the arguments are broadcast against each other.
+        Returns a dict of arrays keyed by QUANTITIES.
+        """
+        r, v, b = np.broadcast_arrays(*(np.asarray(a, dtype=float)
+                                        for a in (target_range, velocity, ballistic_coef)))
+        i, fr = _locate_many(self.ranges, r)
+        j, fv = _locate_many(self.velocities, v)
+        k, fb = _locate_many(self.ballistic_coefs, b)
+        fr, fv, fb = fr[..., None], fv[..., None], fb[..., None]
+
+        result = 0.0
+        for di, wr in ((0, 1 - fr), (1, fr)):
+            for dj, wv in ((0, 1 - fv), (1, fv)):
+                for dk, wb in ((0, 1 - fb), (1, fb)):
+                    result = result + self.values[i + di, j + dj, k + dk] * (wr * wv * wb)
+        return {name: result[..., n] for n, name in enumerate(QUANTITIES)}
+
+    def check_errors(self, samples=None, seed=0, workers=None):
+        """
+        Compare the table with the full solver at the centers of the grid
+        cells, where linear interpolation is least accurate, and store the
+        largest absolute error of each quantity in error_bounds.
+
+        Every (velocity, BC) cell is checked unless samples limits it to
+        that many cells picked at random.
+        """
+        velocity_mid = [(a + b) / 2 for a, b in zip(self.velocities, self.velocities[1:])]
+        bc_mid = [(a + b) / 2 for a, b in zip(self.ballistic_coefs, self.ballistic_coefs[1:])]
+        range_mid = [(a + b) / 2 for a, b in zip(self.ranges, self.ranges[1:])]
+        loads = [(v, b) for v in velocity_mid for b in bc_mid]
+        if samples is not None and samples < len(loads):
+            picked = np.random.default_rng(seed).choice(len(loads), samples, replace=False)
+            loads = [loads[n] for n in sorted(picked)]
+
+        exact = np.stack(_solve_all(loads, range_mid, self.zero_range, self.sight_height,
+                                    self.drag_function, self.options, workers, 8))
+        velocity, bc = (np.array(axis)[:, None] for axis in zip(*loads))
+        table = self.lookup_many(np.array(range_mid)[None, :], velocity, bc)
+        errors = np.abs(np.stack([table[name] for name in QUANTITIES], axis=-1) - exact)
+        self.error_bounds = dict(zip(QUANTITIES, errors.reshape(-1, len(QUANTITIES)).max(axis=0).tolist()))
+        return self.error_bounds
+
+    def save(self, path):
+        """
+        Write the values to path (.npy is added if missing) and the axes and
+        settings to a .json beside it.
+        """
+        values_path, meta_path = _table_paths(path)
+        np.save(values_path, np.asarray(self.values, dtype=np.float32))
+        with open(meta_path, 'w') as f:
+            json.dump({
+                'quantities': QUANTITIES,
+                'ranges': self.ranges,
+                'velocities': self.velocities,
+                'ballistic_coefs': self.ballistic_coefs,
+                'zero_range': self.zero_range,
+                'sight_height': self.sight_height,
+                'drag_function': self.drag_function,
+                'options': self.options,
+                'error_bounds': self.error_bounds,
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open a table written by save, memory-mapping the values unless mmap is False.
+        """
+        values_path, meta_path = _table_paths(path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if tuple(meta['quantities']) != QUANTITIES:
+            raise ValueError(f"{path} stores {meta['quantities']}, expected {QUANTITIES}")
+        values = np.load(values_path, mmap_mode='r' if mmap else None)
+        return cls(meta['ranges'], meta['velocities'], meta['ballistic_coefs'], values,
+                   meta['zero_range'], meta['sight_height'], meta['drag_function'],
+                   meta['options'], meta['error_bounds'])
+
+
+def build_table(ranges, velocities, ballistic_coefs, zero_range=100, sight_height=1.5,
+                drag_function="G1", workers=None, chunk_size=8, check=True, **options):
+    """
+    Precompute a TrajectoryTable with calculate_trajectory, one solver run
+    per (velocity, BC) pair across a process pool (in-process when workers
+    is 1). options are passed on to calculate_trajectory, e.g.
+    integrator="rk45". With check the error bounds are measured too (see
+    TrajectoryTable.check_errors; pass a number to check that many cells).
+    """
+    ranges = sorted(float(r) for r in ranges)
+    velocities = sorted(float(v) for v in velocities)
+    ballistic_coefs = sorted(float(b) for b in ballistic_coefs)
+    get_drag_model(drag_function)  # fail early on an unknown model
+    # calculate_trajectory returns one sample per distinct range from 0 up, and
+    # each axis needs distinct points to interpolate between
+    for name, axis in (('ranges', ranges), ('velocities', velocities), ('ballistic_coefs', ballistic_coefs)):
+        if len(set(axis)) != len(axis) or len(axis) < 2:
+            raise ValueError(f"{name} must be at least two distinct values")
+    if ranges[0] < 0:
+        raise ValueError("ranges must not be negative")
+
+    loads = [(v, b) for v in velocities for b in ballistic_coefs]
+    columns = _solve_all(loads, ranges, zero_range, sight_height, drag_function, options, workers, chunk_size)
+
+    # (velocity, BC, range, quantity) -> (range, velocity, BC, quantity)
+    values = np.stack(columns).reshape(len(velocities), len(ballistic_coefs), len(ranges), len(QUANTITIES))
+    values = np.ascontiguousarray(values.transpose(2, 0, 1, 3), dtype=np.float32)
+
+    table = TrajectoryTable(ranges, velocities, ballistic_coefs, values, zero_range, sight_height,
+                            drag_function, options)
+    if check:
+        table.check_errors(None if check is True else check, workers=workers)
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query precomputed trajectory tables")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="precompute a table")
+    build.add_argument('output', help=".npy file to write (a .json with the axes is written beside it)")
+    build.add_argument('--max-range', type=float, default=1000, help="yards (default: 1000)")
+    build.add_argument('--interval', type=float, default=25, help="yards between range points (default: 25)")
+    build.add_argument('--velocities', type=float, nargs=3, default=(2000, 3400, 29),
+                       metavar=('MIN', 'MAX', 'COUNT'), help="fps (default: 2000 3400 29)")
+    build.add_argument('--bcs', type=float, nargs=3, default=(0.2, 0.8, 25),
+                       metavar=('MIN', 'MAX', 'COUNT'), help="(default: 0.2 0.8 25)")
+    build.add_argument('--zero-range', type=float, default=100, help="yards (default: 100)")
+    build.add_argument('--sight-height', type=float, default=1.5, help="inches (default: 1.5)")
+    build.add_argument('--drag-function', choices=drag_models(), default="G1")
+    build.add_argument('--integrator', choices=("euler", "rk4", "rk45"), default="euler")
+    build.add_argument('--check', type=int, help="cells to check against the solver (default: all)")
+    build.add_argument('-w', '--workers', type=int, default=os.cpu_count(),
+                       help="number of worker processes (default: CPU count)")
+
+    query = commands.add_parser('query', help="interpolate a table")
+    query.add_argument('table', help=".npy file written by build")
+    query.add_argument('--range', type=float, required=True, help="yards")
+    query.add_argument('--velocity', type=float, required=True, help="fps")
+    query.add_argument('--bc', type=float, required=True)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'build':
+            ranges = np.arange(0, args.max_range + args.interval / 2, args.interval)
+            velocities = np.linspace(args.velocities[0], args.velocities[1], int(args.velocities[2]))
+            bcs = np.linspace(args.bcs[0], args.bcs[1], int(args.bcs[2]))
+            table = build_table(ranges, velocities, bcs, args.zero_range, args.sight_height,
+                                args.drag_function, args.workers, check=args.check if args.check is not None else True,
+                                integrator=args.integrator)
+            table.save(args.output)
+            print(json.dumps({'error_bounds': table.error_bounds}, indent=2))
+        else:
+            table = TrajectoryTable.load(args.table)
+            print(json.dumps({**table.lookup(args.range, args.velocity, args.bc)._asdict(),
+                              'error_bounds': table.error_bounds}, indent=2))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()